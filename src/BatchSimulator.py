@@ -0,0 +1,198 @@
+"""
+Many independent games played in lockstep with array operations, for bulk
+rollouts and random-play statistics:
+
+    python BatchSimulator.py --dots 4 --games 100000 --policy greedy
+"""
+
+from argparse import ArgumentParser
+from typing import List, Optional
+from Bitboard import Bitboard
+from BoardLayout import BoardLayout
+from GameRecord import GameRecord
+from GameState import GameState
+import time
+import numpy as np
+
+POLICIES = ("random", "greedy")
+
+
+class BatchSimulator:
+    """
+    n games on one layout. edges[i, e] tells whether game i has edge e
+    (BoardLayout numbering) marked, so row_status and col_status are
+    views of it; sides counts the marked sides of every box and owner is
+    -1 for boxes of player 1, 1 for player 2 and 0 for free boxes. Both
+    have an extra last column standing for outside the board, so that
+    every edge has two boxes.
+
+    step plays one move in every unfinished game at once. A game whose
+    move completes a box keeps the turn, the others pass it. history
+    holds the moves played since the simulator was created, in order.
+    """
+
+    def __init__(self, layout: BoardLayout, n: int, seed: Optional[int] = None):
+        self.layout = layout
+        self.n = n
+        self.rng = np.random.default_rng(seed)
+        self.edges = np.zeros((n, layout.num_edges), dtype=bool)
+        self.sides = np.zeros((n, layout.num_boxes + 1), dtype=np.int8)
+        self.owner = np.zeros((n, layout.num_boxes + 1), dtype=np.int8)
+        self.player1_turn = np.ones(n, dtype=bool)
+        self.player1_starts = self.player1_turn.copy()
+        self.filled = np.zeros(n, dtype=np.int16)
+        self.start = self.filled.copy()
+        self.history = np.full((n, layout.num_edges), -1, dtype=np.int16)
+        # boxes on both sides of every edge, num_boxes standing for outside
+        self.edge_boxes = layout.edge_box_pairs
+
+    @classmethod
+    def from_board(cls, board: Bitboard, n: int, seed: Optional[int] = None) -> "BatchSimulator":
+        """
+        n copies of board, e.g. for rollouts from a search tree leaf.
+        """
+        layout = board.layout
+        sim = cls(layout, n, seed)
+        sim.edges[:] = [bool(board.edges >> e & 1) for e in range(layout.num_edges)]
+        sim.sides[:, :-1] = board.moves.sides
+        sim.owner[:, :-1] = [-1 if board.p1_boxes >> b & 1 else 1 if board.p2_boxes >> b & 1 else 0
+                        for b in range(layout.num_boxes)]
+        sim.player1_turn[:] = board.player1_turn
+        sim.player1_starts[:] = board.player1_turn
+        sim.filled[:] = board.filled
+        sim.start[:] = board.filled
+        return sim
+
+    @classmethod
+    def from_state(cls, state: GameState, n: int, seed: Optional[int] = None) -> "BatchSimulator":
+        return cls.from_board(Bitboard.from_state(state), n, seed)
+
+    @property
+    def row_status(self) -> np.ndarray:
+        layout = self.layout
+        return self.edges[:, :layout.num_row_edges].reshape(self.n, layout.rows + 1, layout.cols)
+
+    @property
+    def col_status(self) -> np.ndarray:
+        layout = self.layout
+        return self.edges[:, layout.num_row_edges:].reshape(self.n, layout.rows, layout.cols + 1)
+
+    @property
+    def board_status(self) -> np.ndarray:
+        """
+        As in GameState: -4 and 4 for taken boxes, otherwise the number of
+        marked sides.
+        """
+        owner = self.owner[:, :-1]
+        status = np.where(owner != 0, 4 * owner, self.sides[:, :-1])
+        return status.reshape(self.n, self.layout.rows, self.layout.cols)
+
+    @property
+    def active(self) -> np.ndarray:
+        return self.filled < self.layout.num_edges
+
+    def scores(self) -> np.ndarray:
+        """
+        (n, 2) boxes of player 1 and player 2.
+        """
+        owner = self.owner[:, :-1]
+        return np.stack([(owner == -1).sum(axis=1), (owner == 1).sum(axis=1)], axis=1)
+
+    def score(self) -> np.ndarray:
+        """
+        Boxes of player 2 minus boxes of player 1, per game.
+        """
+        return self.owner[:, :-1].sum(axis=1, dtype=np.int16)
+
+    def step(self, moves: np.ndarray) -> np.ndarray:
+        """
+        Plays moves[i] in game i, skipping games where it is negative, and
+        returns the number of boxes each move completed.
+        """
+        games = np.flatnonzero(moves >= 0)
+        edges = moves[games]
+        if np.any(self.edges[games, edges]):
+            raise ValueError("Edge is already marked")
+        self.edges[games, edges] = True
+        self.history[games, self.filled[games]] = edges
+        self.filled[games] += 1
+
+        # the two boxes of an edge differ, so += adds to both; outside is
+        # reset before it could ever count 4
+        boxes = self.edge_boxes[edges]
+        rows = games[:, None]
+        self.sides[rows, boxes] += 1
+        self.sides[:, -1] = 0
+        done = self.sides[rows, boxes] == 4
+        player = np.where(self.player1_turn[games], -1, 1).astype(np.int8)
+        self.owner[rows, boxes] += done * player[:, None]
+
+        completed = np.zeros(self.n, dtype=np.int8)
+        completed[games] = done.sum(axis=1)
+        self.player1_turn[games] ^= completed[games] == 0
+        return completed
+
+    def random_moves(self) -> np.ndarray:
+        """
+        A free edge of every unfinished game, uniformly, -1 for finished.
+        """
+        keys = self.rng.random(self.edges.shape)
+        keys[self.edges] = -1
+        moves = keys.argmax(axis=1)
+        moves[~self.active] = -1
+        return moves
+
+    def greedy_moves(self) -> np.ndarray:
+        """
+        As the MCTSBot rollouts: a move completing a box if there is one,
+        else one not leaving a three-sided box, else any, at random.
+        """
+        around = self.sides[:, self.edge_boxes]
+        completes = (around == 3).any(axis=2)
+        safe = ~(around == 2).any(axis=2)
+        keys = self.rng.random(self.edges.shape) + 2 * completes + safe
+        keys[self.edges] = -1
+        moves = keys.argmax(axis=1)
+        moves[~self.active] = -1
+        return moves
+
+    def run(self, policy: str = "greedy") -> np.ndarray:
+        """
+        Plays every game to the end, returns score().
+        """
+        if policy not in POLICIES:
+            raise ValueError("policy must be one of " + ", ".join(POLICIES))
+        choose = self.random_moves if policy == "random" else self.greedy_moves
+        while self.active.any():
+            self.step(choose())
+        return self.score()
+
+    def records(self) -> List[GameRecord]:
+        """
+        The game of every simulator that started from an empty board.
+        """
+        layout = self.layout
+        return [GameRecord(layout.rows, layout.cols, bool(self.player1_starts[i]),
+                           tuple(self.history[i, :self.filled[i]].tolist()))
+                for i in range(self.n) if self.start[i] == 0]
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Play many games at once with a simple policy.")
+    parser.add_argument("--dots", type=int, default=4)
+    parser.add_argument("--games", type=int, default=10000)
+    parser.add_argument("--policy", choices=POLICIES, default="greedy")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--records", default=None, help="append the games to this GameRecord file")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    sim = BatchSimulator(BoardLayout.get(args.dots - 1, args.dots - 1), args.games, args.seed)
+    score = sim.run(args.policy)
+    elapsed = time.perf_counter() - start
+    print("{} games in {:.2f} s ({:.0f} games/s)".format(args.games, elapsed, args.games / elapsed))
+    print("player 1 wins {:.3f}, player 2 wins {:.3f}, draws {:.3f}, mean score (p2 - p1) {:.3f}".format(
+        (score < 0).mean(), (score > 0).mean(), (score == 0).mean(), score.mean()))
+    if args.records:
+        from GameRecord import write_records
+        write_records(args.records, sim.records())
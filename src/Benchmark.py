@@ -0,0 +1,365 @@
+"""
+Fixed benchmark positions for bot latency and strength.
+
+The suite in benchmarks/positions.json holds openings, midgames and chain
+endgames on several board sizes, each with the set of moves counted as
+correct. The runner plays every position with a fresh bot and records
+the move, whether it is in the expected set, the latency and the nodes
+searched (from the stats hook, see SearchStats). Examples:
+
+    python Benchmark.py generate
+    python Benchmark.py run MinimaxBot:time_limit=None,max_depth=4 MCTSBot:iterations=500,seed=0
+    python Benchmark.py run RandomBot --compare ../benchmarks/baselines/RandomBot.json
+
+run writes one result file per bot into benchmarks/baselines unless --out
+is given; the files are sorted JSON so they can be diffed between
+versions, and --compare prints the positions whose correctness changed.
+"""
+
+from argparse import ArgumentParser
+from typing import List, NamedTuple, Optional
+from Bitboard import Bitboard
+from BoardLayout import BoardLayout
+from EndgameSolver import EndgameSolver
+from GameAction import GameAction
+from GameState import GameState
+from Tournament import make_bot
+import json
+import os
+import random
+import re
+import time
+import numpy as np
+
+BENCHMARK_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "benchmarks"))
+POSITIONS_PATH = os.path.join(BENCHMARK_DIR, "positions.json")
+BASELINE_DIR = os.path.join(BENCHMARK_DIR, "baselines")
+DEFAULT_BOTS = ["RandomBot", "LocalSearchBot", "MinimaxBot:time_limit=None,max_depth=4,seed=0",
+                "MCTSBot:iterations=500,seed=0"]
+
+# free edges up to which midgame positions are solved exactly
+EXACT_FREE_EDGES = 16
+# safe moves taken back from the end of the safe phase for a midgame
+MIDGAME_MOVES_LEFT = 3
+
+
+class BenchmarkPosition(NamedTuple):
+    """
+    category: "opening", "midgame" or "endgame"
+    expected: the moves counted as correct
+    exact: True if expected holds every optimal move and nothing else.
+        Otherwise (openings, and midgames too big to solve) it holds every
+        move not giving a box away.
+    value: boxes the player to move gains from here with perfect play,
+        None when not exact
+    """
+
+    name: str
+    category: str
+    state: GameState
+    expected: List[GameAction]
+    exact: bool
+    value: Optional[int]
+
+
+def encode_position(position: BenchmarkPosition) -> dict:
+    return {
+        "name": position.name,
+        "category": position.category,
+        "state": position.state.to_dict(),
+        "expected": [[a.action_type, list(a.position)] for a in position.expected],
+        "exact": position.exact,
+        "value": position.value,
+    }
+
+
+def decode_position(data: dict) -> BenchmarkPosition:
+    expected = [GameAction(action_type, tuple(position)) for action_type, position in data["expected"]]
+    return BenchmarkPosition(data["name"], data["category"], GameState.from_dict(data["state"]),
+                             expected, data["exact"], data["value"])
+
+
+def load_positions(path: str = POSITIONS_PATH) -> List[BenchmarkPosition]:
+    with open(path) as f:
+        return [decode_position(data) for data in json.load(f)["positions"]]
+
+
+def save_positions(positions: List[BenchmarkPosition], path: str = POSITIONS_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({"version": 1, "positions": [encode_position(p) for p in positions]}, f, indent=1)
+        f.write("\n")
+
+
+def move_value(board: Bitboard, edge: int, value_of) -> int:
+    """
+    Value of edge for the player to move, given value_of(child) for the
+    player to move in the child position.
+    """
+    taken = board.make_move(edge)
+    value = value_of(board)
+    board.unmake_move()
+    return taken + value if taken else -value
+
+
+def solved_value(board: Bitboard, memo: dict, solver: EndgameSolver) -> int:
+    """
+    Exact value for the player to move, searching to the end of the game
+    but scoring chain and loop endgames with the solver.
+    """
+    value = memo.get(board.edges)
+    if value is not None:
+        return value
+    if board.is_final():
+        return 0
+    solution = solver.solve(board)
+    if solution is not None:
+        value = solution.value
+    else:
+        value = max(move_value(board, edge, lambda child: solved_value(child, memo, solver))
+                    for edge in board.free_edges())
+    memo[board.edges] = value
+    return value
+
+
+def best_moves(board: Bitboard, value_of):
+    values = {edge: move_value(board, edge, value_of) for edge in board.free_edges()}
+    best = max(values.values())
+    return [edge for edge, value in values.items() if value == best], best
+
+
+def play_safe_moves(board: Bitboard, rng: random.Random, stop) -> bool:
+    """
+    Plays random moves, taking boxes when offered and otherwise never
+    leaving a three-sided box, until stop(board) holds. Returns False if
+    the safe moves ran out first.
+    """
+    while not stop(board):
+        captures = [e for e in board.free_edges() if board.completes_box(e)]
+        if captures:
+            board.make_move(rng.choice(captures))
+            continue
+        safe = safe_moves(board)
+        if not safe:
+            return False
+        board.make_move(rng.choice(safe))
+    return True
+
+
+def opening_position(layout: BoardLayout, rng: random.Random) -> Bitboard:
+    board = Bitboard(layout)
+    play_safe_moves(board, rng, lambda b: b.filled >= layout.num_boxes // 2)
+    return board
+
+
+def midgame_position(layout: BoardLayout, rng: random.Random) -> Bitboard:
+    # a few safe moves before the end of the safe phase
+    while True:
+        board = Bitboard(layout)
+        play_safe_moves(board, rng, lambda b: False)
+        for _ in range(min(MIDGAME_MOVES_LEFT, board.filled)):
+            board.unmake_move()
+        board = Bitboard(layout, board.edges, board.p1_boxes, board.p2_boxes, board.player1_turn)
+        if not board.three_sided and safe_moves(board):
+            return board
+
+
+def endgame_position(layout: BoardLayout, rng: random.Random, solver: EndgameSolver) -> Bitboard:
+    # every free edge gives a box away and the chains and loops can be solved
+    while True:
+        board = Bitboard(layout)
+        play_safe_moves(board, rng, lambda b: False)
+        if board.three_sided or board.is_final():
+            continue
+        if all(solver.solve(child) is not None for child in children(board)):
+            return board
+
+
+def safe_moves(board: Bitboard) -> List[int]:
+    return [e for e in board.free_edges() if not board.creates_three_sided_box(e)]
+
+
+def children(board: Bitboard) -> List[Bitboard]:
+    result = []
+    for edge in board.free_edges():
+        child = board.copy()
+        child.make_move(edge)
+        if not child.is_final():
+            result.append(child)
+    return result
+
+
+def generate_positions(sizes=(4, 5, 6), per_category: int = 3, seed: int = 0) -> List[BenchmarkPosition]:
+    """
+    The benchmark suite, the same for the same arguments. sizes are
+    numbers of dots on each side.
+    """
+    rng = random.Random(seed)
+    solver = EndgameSolver()
+    positions = []
+    for dots in sizes:
+        layout = BoardLayout.get(dots - 1, dots - 1)
+        size = "{}x{}".format(dots - 1, dots - 1)
+
+        for i in range(per_category):
+            board = opening_position(layout, rng)
+            positions.append(BenchmarkPosition(
+                "opening-{}-{}".format(size, i), "opening", board.to_state(),
+                [board.action_of(e) for e in safe_moves(board)], False, None))
+
+        memo = {}
+        for i in range(per_category):
+            board = midgame_position(layout, rng)
+            name = "midgame-{}-{}".format(size, i)
+            if board.num_free_edges() <= EXACT_FREE_EDGES:
+                edges, value = best_moves(board, lambda b: solved_value(b, memo, solver))
+                positions.append(BenchmarkPosition(
+                    name, "midgame", board.to_state(), [board.action_of(e) for e in edges], True, value))
+            else:
+                positions.append(BenchmarkPosition(
+                    name, "midgame", board.to_state(), [board.action_of(e) for e in safe_moves(board)],
+                    False, None))
+
+        def endgame_value(b):
+            return 0 if b.is_final() else solver.solve(b).value
+
+        for i in range(per_category):
+            board = endgame_position(layout, rng, solver)
+            edges, value = best_moves(board, endgame_value)
+            positions.append(BenchmarkPosition(
+                "endgame-{}-{}".format(size, i), "endgame", board.to_state(),
+                [board.action_of(e) for e in edges], True, value))
+    return positions
+
+
+def run_position(spec: str, position: BenchmarkPosition, seed: int = 0, repeat: int = 1) -> dict:
+    """
+    Plays position with a fresh bot built from spec, repeat times, and
+    keeps the fastest run.
+    """
+    result = None
+    for _ in range(repeat):
+        bot = make_bot(spec)
+        moves = []
+        bot.set_stats_hook(moves.append)
+        random.seed(seed)
+        np.random.seed(seed)
+        start = time.perf_counter()
+        action = bot.get_action(position.state)
+        latency = time.perf_counter() - start
+        if hasattr(bot, "close"):
+            bot.close()
+        if result is None or latency < result["latency"]:
+            nodes = moves[0].nodes if moves else 0
+            result = {
+                "position": position.name,
+                "category": position.category,
+                "action": [action.action_type, [int(v) for v in action.position]],
+                "correct": action in position.expected,
+                "latency": latency,
+                "nodes": nodes,
+                "nodes_per_second": nodes / latency if latency > 0 else 0.0,
+            }
+    return result
+
+
+def run_benchmark(spec: str, positions: List[BenchmarkPosition], seed: int = 0, repeat: int = 1) -> dict:
+    results = [run_position(spec, position, seed, repeat) for position in positions]
+    summary = {}
+    for category in sorted({r["category"] for r in results}) + ["all"]:
+        rows = [r for r in results if category in ("all", r["category"])]
+        latency = sum(r["latency"] for r in rows)
+        nodes = sum(r["nodes"] for r in rows)
+        summary[category] = {
+            "positions": len(rows),
+            "correct": sum(r["correct"] for r in rows),
+            "mean_latency": latency / len(rows),
+            "max_latency": max(r["latency"] for r in rows),
+            "nodes": nodes,
+            "nodes_per_second": nodes / latency if latency > 0 else 0.0,
+        }
+    return {"bot": spec, "seed": seed, "summary": summary, "results": results}
+
+
+def baseline_path(spec: str) -> str:
+    return os.path.join(BASELINE_DIR, re.sub(r"[^A-Za-z0-9_.=-]+", "_", spec) + ".json")
+
+
+def write_report(report: dict, path: str):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=1, sort_keys=True)
+        f.write("\n")
+
+
+def format_report(report: dict) -> str:
+    lines = [report["bot"], "{:<10}{:>10}{:>10}{:>14}{:>14}{:>12}{:>12}".format(
+        "category", "positions", "correct", "mean ms", "max ms", "nodes", "nodes/s")]
+    for category, s in report["summary"].items():
+        lines.append("{:<10}{:>10}{:>10}{:>14.2f}{:>14.2f}{:>12}{:>12.0f}".format(
+            category, s["positions"], s["correct"], s["mean_latency"] * 1000,
+            s["max_latency"] * 1000, s["nodes"], s["nodes_per_second"]))
+    return "\n".join(lines)
+
+
+def compare_reports(old: dict, new: dict) -> str:
+    """
+    Positions whose correctness changed, and the mean latency and total
+    node ratios. The reports may be of different bots, e.g. two search
+    modes of MinimaxBot.
+    """
+    before = {r["position"]: r for r in old["results"]}
+    lines = []
+    for r in new["results"]:
+        previous = before.get(r["position"])
+        if previous is not None and previous["correct"] != r["correct"]:
+            lines.append("{}: {} -> {}".format(r["position"], "correct" if previous["correct"] else "wrong",
+                                               "correct" if r["correct"] else "wrong"))
+    old_latency = old["summary"]["all"]["mean_latency"]
+    new_latency = new["summary"]["all"]["mean_latency"]
+    old_nodes = sum(r["nodes"] for r in old["results"])
+    new_nodes = sum(r["nodes"] for r in new["results"])
+    lines.append("correct: {} -> {}, mean latency x{:.2f}, nodes {} -> {} (x{:.2f})".format(
+        old["summary"]["all"]["correct"], new["summary"]["all"]["correct"],
+        new_latency / old_latency if old_latency > 0 else float("nan"),
+        old_nodes, new_nodes, new_nodes / old_nodes if old_nodes > 0 else float("nan")))
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Benchmark bots on fixed positions.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    generate = commands.add_parser("generate", help="rebuild the position suite")
+    generate.add_argument("--dots", type=int, nargs="+", default=[4, 5, 6])
+    generate.add_argument("--count", type=int, default=3, help="positions per category and size")
+    generate.add_argument("--seed", type=int, default=0)
+    generate.add_argument("--out", default=POSITIONS_PATH)
+
+    run = commands.add_parser("run", help="play the suite with some bots")
+    run.add_argument("bots", nargs="*", default=DEFAULT_BOTS, help="bot specs as in Tournament.py")
+    run.add_argument("--positions", default=POSITIONS_PATH)
+    run.add_argument("--seed", type=int, default=0)
+    run.add_argument("--repeat", type=int, default=1, help="runs per position, the fastest is kept")
+    run.add_argument("--out", default=None, help="result directory, default benchmarks/baselines")
+    run.add_argument("--compare", default=None, help="result file of an earlier run to compare with")
+    args = parser.parse_args()
+
+    if args.command == "generate":
+        start = time.perf_counter()
+        suite = generate_positions(args.dots, args.count, args.seed)
+        save_positions(suite, args.out)
+        print("wrote {} positions to {} in {:.1f} s".format(len(suite), args.out, time.perf_counter() - start))
+    else:
+        suite = load_positions(args.positions)
+        for spec in args.bots:
+            report = run_benchmark(spec, suite, args.seed, args.repeat)
+            print(format_report(report))
+            if args.compare:
+                with open(args.compare) as f:
+                    print(compare_reports(json.load(f), report))
+            path = baseline_path(spec)
+            if args.out:
+                path = os.path.join(args.out, os.path.basename(path))
+            write_report(report, path)
+            print("wrote " + path + "\n")
@@ -0,0 +1,362 @@
+from BoardLayout import BoardLayout
+from GameAction import GameAction
+from GameState import GameState
+from MoveIndex import MoveIndex
+from operator import xor
+import struct
+import numpy as np
+
+# rows, cols, flags (bit 0: player 1 to move) of an encoded position
+STATE_HEADER = struct.Struct("<BBB")
+
+
+# bytes taken by the edges and by the box owners in Bitboard.to_bytes
+def encoded_sizes(layout: BoardLayout):
+    return (layout.num_edges + 7) // 8, (2 * layout.num_boxes + 7) // 8
+
+
+def permute_bits(bits: int, perm: list) -> int:
+    result = 0
+    for i, p in enumerate(perm):
+        if bits >> i & 1:
+            result |= 1 << p
+    return result
+
+
+class Bitboard:
+    """
+    Compact game state for search.
+
+    edges: int
+        Bit e is set when edge e (see BoardLayout) has been marked.
+
+    p1_boxes, p2_boxes: int
+        Bit b is set when box b has been taken by player 1 / player 2.
+
+    player1_turn: bool
+        True if it is player 1 turn, False for player 2.
+
+    hash: int
+        Zobrist hash of edges, box owners and side to move.
+
+    edge_hash: int
+        Zobrist hash of the edges only. The rest of the game only depends
+        on the edges, so this keys positions whose value is counted from
+        the point of view of the player to move.
+
+    sym_edge_hashes, sym_hashes: tuple
+        edge_hash, and hash without the side to move, of the position
+        under every transform of the layout (see Symmetry), used by
+        canonical and canonical_edge.
+
+    score: int
+        Boxes of player 2 minus boxes of player 1.
+
+    filled: int
+        Number of marked edges.
+
+    three_sided: int
+        Number of boxes with exactly three sides marked.
+
+    moves: MoveIndex
+        The free edges and the marked sides of every box.
+
+    The hashes, score, filled, three_sided and moves are kept up to date by make_move
+    and unmake_move, so reading them does not depend on the board size.
+
+    Moves are applied in place with make_move and reverted with
+    unmake_move, so searching does not allocate arrays per node.
+    """
+
+    def __init__(self, layout: BoardLayout, edges: int = 0, p1_boxes: int = 0,
+                 p2_boxes: int = 0, player1_turn: bool = True):
+        self.layout = layout
+        self.edges = edges
+        self.p1_boxes = p1_boxes
+        self.p2_boxes = p2_boxes
+        self.player1_turn = player1_turn
+        self.hash = self.compute_hash()
+        self.edge_hash = self.compute_edge_hash()
+        self.sym_edge_hashes, self.sym_hashes = self.compute_sym_hashes()
+        self.score = p2_boxes.bit_count() - p1_boxes.bit_count()
+        self.filled = edges.bit_count()
+        self.moves = MoveIndex(layout, edges)
+        self.three_sided = self.moves.sides.count(3)
+        self._history = []
+
+    @classmethod
+    def from_state(cls, state: GameState) -> "Bitboard":
+        rows, cols = state.board_status.shape
+        layout = BoardLayout.get(rows, cols)
+
+        # tolist() gives Python ints, NumPy ints would overflow past 63 bits
+        edges = 0
+        for y, x in np.argwhere(state.row_status == 1).tolist():
+            edges |= 1 << layout.edge_of("row", (x, y))
+        for y, x in np.argwhere(state.col_status == 1).tolist():
+            edges |= 1 << layout.edge_of("col", (x, y))
+
+        p1_boxes = 0
+        for y, x in np.argwhere(state.board_status == -4).tolist():
+            p1_boxes |= 1 << (y * cols + x)
+        p2_boxes = 0
+        for y, x in np.argwhere(state.board_status == 4).tolist():
+            p2_boxes |= 1 << (y * cols + x)
+
+        return cls(layout, edges, p1_boxes, p2_boxes, bool(state.player1_turn))
+
+    def to_state(self) -> GameState:
+        """
+        Converts back to GameState. Boxes which are not taken yet get their
+        number of marked sides, without the sign of the last player.
+        """
+        layout = self.layout
+        board_status = np.zeros(shape=(layout.rows, layout.cols), dtype=np.int8)
+        row_status = np.zeros(shape=(layout.rows + 1, layout.cols), dtype=np.int8)
+        col_status = np.zeros(shape=(layout.rows, layout.cols + 1), dtype=np.int8)
+
+        for e in range(layout.num_edges):
+            if self.edges >> e & 1:
+                action_type, (x, y) = layout.action_of(e)
+                if action_type == "row":
+                    row_status[y, x] = 1
+                else:
+                    col_status[y, x] = 1
+
+        for b in range(layout.num_boxes):
+            y, x = divmod(b, layout.cols)
+            if self.p1_boxes >> b & 1:
+                board_status[y, x] = -4
+            elif self.p2_boxes >> b & 1:
+                board_status[y, x] = 4
+            else:
+                board_status[y, x] = self.box_sides(b)
+
+        return GameState(board_status, row_status, col_status, self.player1_turn)
+
+    def to_bytes(self) -> bytes:
+        """
+        Compact encoding: STATE_HEADER, then one bit per edge and two bits
+        per box owner (0 free, 1 player 1, 2 player 2), little-endian.
+        """
+        layout = self.layout
+        owners = 0
+        for b in range(layout.num_boxes):
+            if self.p1_boxes >> b & 1:
+                owners |= 1 << 2 * b
+            elif self.p2_boxes >> b & 1:
+                owners |= 2 << 2 * b
+        edge_bytes, owner_bytes = encoded_sizes(layout)
+        return (STATE_HEADER.pack(layout.rows, layout.cols, int(self.player1_turn))
+                + self.edges.to_bytes(edge_bytes, "little")
+                + owners.to_bytes(owner_bytes, "little"))
+
+    @classmethod
+    def from_bytes(cls, data: bytes, offset: int = 0) -> "Bitboard":
+        rows, cols, flags = STATE_HEADER.unpack_from(data, offset)
+        layout = BoardLayout.get(rows, cols)
+        edge_bytes, owner_bytes = encoded_sizes(layout)
+        start = offset + STATE_HEADER.size
+        edges = int.from_bytes(data[start:start + edge_bytes], "little")
+        owners = int.from_bytes(data[start + edge_bytes:start + edge_bytes + owner_bytes], "little")
+        p1_boxes = 0
+        p2_boxes = 0
+        for b in range(layout.num_boxes):
+            owner = owners >> 2 * b & 3
+            if owner == 1:
+                p1_boxes |= 1 << b
+            elif owner == 2:
+                p2_boxes |= 1 << b
+        return cls(layout, edges, p1_boxes, p2_boxes, bool(flags & 1))
+
+    def compute_edge_hash(self) -> int:
+        layout = self.layout
+        h = 0
+        for e in range(layout.num_edges):
+            if self.edges >> e & 1:
+                h ^= layout.edge_keys[e]
+        return h
+
+    def compute_hash(self) -> int:
+        layout = self.layout
+        h = self.compute_edge_hash()
+        if self.player1_turn:
+            h ^= layout.player1_turn_key
+        for b in range(layout.num_boxes):
+            if self.p1_boxes >> b & 1:
+                h ^= layout.p1_box_keys[b]
+            elif self.p2_boxes >> b & 1:
+                h ^= layout.p2_box_keys[b]
+        return h
+
+    def compute_sym_hashes(self):
+        """
+        Hashes of the position under every transform of the layout, as
+        (edges only, edges and boxes without the turn). Entry 0 is the
+        identity.
+        """
+        layout = self.layout
+        edge_hashes = [0] * len(layout.transforms)
+        box_hashes = [0] * len(layout.transforms)
+        for e in range(layout.num_edges):
+            if self.edges >> e & 1:
+                for t, key in enumerate(layout.sym_edge_keys[e]):
+                    edge_hashes[t] ^= key
+        for b in range(layout.num_boxes):
+            if self.p1_boxes >> b & 1:
+                keys = layout.sym_p1_box_keys[b]
+            elif self.p2_boxes >> b & 1:
+                keys = layout.sym_p2_box_keys[b]
+            else:
+                continue
+            for t, key in enumerate(keys):
+                box_hashes[t] ^= key
+        return tuple(edge_hashes), tuple(map(xor, edge_hashes, box_hashes))
+
+    def canonical(self):
+        """
+        Returns (key, t): the smallest hash over all transforms of the
+        position, and a transform t which gives it. Positions which are
+        rotations or reflections of each other share the key.
+        """
+        key, t = min(zip(self.sym_hashes, range(len(self.sym_hashes))))
+        if self.player1_turn:
+            key ^= self.layout.player1_turn_key
+        return key, t
+
+    def canonical_edge(self):
+        """
+        As canonical, for the edges only (see edge_hash).
+        """
+        return min(zip(self.sym_edge_hashes, range(len(self.sym_edge_hashes))))
+
+    def symmetries(self) -> list:
+        """
+        The transforms which map the position exactly onto itself,
+        always including the identity 0.
+        """
+        layout = self.layout
+        result = []
+        for t, h in enumerate(self.sym_hashes):
+            if h != self.sym_hashes[0]:
+                continue
+            edge_perm, box_perm = layout.edge_perms[t], layout.box_perms[t]
+            if (permute_bits(self.edges, edge_perm) == self.edges
+                    and permute_bits(self.p1_boxes, box_perm) == self.p1_boxes
+                    and permute_bits(self.p2_boxes, box_perm) == self.p2_boxes):
+                result.append(t)
+        return result
+
+    def copy(self) -> "Bitboard":
+        board = Bitboard.__new__(Bitboard)
+        board.layout = self.layout
+        board.edges = self.edges
+        board.p1_boxes = self.p1_boxes
+        board.p2_boxes = self.p2_boxes
+        board.player1_turn = self.player1_turn
+        board.hash = self.hash
+        board.edge_hash = self.edge_hash
+        board.sym_edge_hashes = self.sym_edge_hashes
+        board.sym_hashes = self.sym_hashes
+        board.score = self.score
+        board.filled = self.filled
+        board.three_sided = self.three_sided
+        board.moves = self.moves.copy()
+        board._history = []
+        return board
+
+    def is_free(self, edge: int) -> bool:
+        return not self.edges >> edge & 1
+
+    def free_edges(self) -> list:
+        return self.moves.moves.copy()
+
+    def num_free_edges(self) -> int:
+        return self.layout.num_edges - self.filled
+
+    def box_sides(self, box: int) -> int:
+        return self.moves.sides[box]
+
+    def is_final(self) -> bool:
+        return self.filled == self.layout.num_edges
+
+    def completes_box(self, edge: int) -> bool:
+        """
+        True if marking edge would take at least one box.
+        """
+        return self.moves.completes_box(edge)
+
+    def creates_three_sided_box(self, edge: int) -> bool:
+        """
+        True if marking edge would leave a box with three sides to the
+        opponent.
+        """
+        return self.moves.creates_three_sided_box(edge)
+
+    def make_move(self, edge: int) -> int:
+        """
+        Marks edge for the player to move and returns the number of boxes
+        taken. The turn passes to the other player only if no box is taken.
+        """
+        layout = self.layout
+        edges = self.edges | (1 << edge)
+        h = self.hash ^ layout.edge_keys[edge]
+        box_keys = layout.p1_box_keys if self.player1_turn else layout.p2_box_keys
+        sym_box_keys = layout.sym_p1_box_keys if self.player1_turn else layout.sym_p2_box_keys
+        sym_edge_hash = tuple(map(xor, self.sym_edge_hashes, layout.sym_edge_keys[edge]))
+        sym_hash = tuple(map(xor, self.sym_hashes, layout.sym_edge_keys[edge]))
+        captured = 0
+        three_sided = self.three_sided
+        box_sides = self.moves.sides
+        self.moves.remove(edge)
+        for b in layout.edge_boxes[edge]:
+            sides = box_sides[b]
+            if sides == 4:
+                captured |= 1 << b
+                h ^= box_keys[b]
+                sym_hash = tuple(map(xor, sym_hash, sym_box_keys[b]))
+                three_sided -= 1
+            elif sides == 3:
+                three_sided += 1
+
+        self._history.append((edge, captured, self.player1_turn, self.hash,
+                              self.score, self.three_sided, self.sym_edge_hashes, self.sym_hashes))
+        self.edges = edges
+        self.edge_hash ^= layout.edge_keys[edge]
+        self.sym_edge_hashes = sym_edge_hash
+        self.sym_hashes = sym_hash
+        self.filled += 1
+        self.three_sided = three_sided
+        if captured:
+            taken = captured.bit_count()
+            if self.player1_turn:
+                self.p1_boxes |= captured
+                self.score -= taken
+            else:
+                self.p2_boxes |= captured
+                self.score += taken
+        else:
+            self.player1_turn = not self.player1_turn
+            h ^= layout.player1_turn_key
+        self.hash = h
+        return captured.bit_count()
+
+    def unmake_move(self):
+        (edge, captured, player1_turn, self.hash, self.score,
+         self.three_sided, self.sym_edge_hashes, self.sym_hashes) = self._history.pop()
+        self.edges &= ~(1 << edge)
+        self.moves.add(edge)
+        self.edge_hash ^= self.layout.edge_keys[edge]
+        self.filled -= 1
+        if captured:
+            if player1_turn:
+                self.p1_boxes &= ~captured
+            else:
+                self.p2_boxes &= ~captured
+        self.player1_turn = player1_turn
+
+    def action_of(self, edge: int) -> GameAction:
+        return self.layout.action_of(edge)
+
+    def edge_of(self, action: GameAction) -> int:
+        return self.layout.edge_of(action.action_type, action.position)
@@ -0,0 +1,111 @@
+from typing import Dict, List, Tuple
+from GameAction import GameAction
+from Symmetry import box_permutation, edge_permutation, inverse, transforms_for
+import random
+import numpy as np
+
+
+class BoardLayout:
+    """
+    Precomputed edge and box geometry for a board of rows x cols boxes.
+
+    Edges are numbered row edges first, then col edges:
+        row edge (x, y) -> y * cols + x
+        col edge (x, y) -> num_row_edges + y * (cols + 1) + x
+
+    Boxes are numbered y * cols + x, matching board_status[y, x].
+
+    Zobrist keys for edges, box owners and the side to move are drawn from
+    a generator seeded by the board size, so hashes are stable between runs
+    and processes.
+
+    edge_perms[t] and box_perms[t] move edges and boxes by transform t of
+    Symmetry, and the sym_*_keys give for every edge or box the Zobrist key
+    of its image under each transform, so that Bitboard can hash all the
+    transformed positions at once.
+
+    Layouts are immutable and shared, use BoardLayout.get(rows, cols).
+    """
+
+    _cache: Dict[Tuple[int, int], "BoardLayout"] = {}
+
+    def __init__(self, rows: int, cols: int):
+        self.rows = rows
+        self.cols = cols
+        self.num_boxes = rows * cols
+        self.num_row_edges = (rows + 1) * cols
+        self.num_col_edges = rows * (cols + 1)
+        self.num_edges = self.num_row_edges + self.num_col_edges
+        self.full_edges = (1 << self.num_edges) - 1
+
+        # boxes touching each edge (one on the border, two inside)
+        self.edge_boxes: List[Tuple[int, ...]] = []
+        for e in range(self.num_edges):
+            action_type, (x, y) = self.action_of(e)
+            boxes = []
+            if action_type == "row":
+                if y > 0:
+                    boxes.append((y - 1) * cols + x)
+                if y < rows:
+                    boxes.append(y * cols + x)
+            else:
+                if x > 0:
+                    boxes.append(y * cols + x - 1)
+                if x < cols:
+                    boxes.append(y * cols + x)
+            self.edge_boxes.append(tuple(boxes))
+        # the same as an array of two boxes per edge, num_boxes standing for
+        # outside the board
+        self.edge_box_pairs = np.array([boxes + (self.num_boxes,) * (2 - len(boxes))
+                                        for boxes in self.edge_boxes], dtype=np.intp)
+
+        # the four edges of each box, as a bit mask
+        self.box_masks: List[int] = []
+        for b in range(self.num_boxes):
+            y, x = divmod(b, cols)
+            self.box_masks.append(
+                (1 << self.edge_of("row", (x, y)))
+                | (1 << self.edge_of("row", (x, y + 1)))
+                | (1 << self.edge_of("col", (x, y)))
+                | (1 << self.edge_of("col", (x + 1, y))))
+
+        rng = random.Random(rows * 1000 + cols)
+        self.edge_keys = [rng.getrandbits(64) for _ in range(self.num_edges)]
+        self.p1_box_keys = [rng.getrandbits(64) for _ in range(self.num_boxes)]
+        self.p2_box_keys = [rng.getrandbits(64) for _ in range(self.num_boxes)]
+        self.player1_turn_key = rng.getrandbits(64)
+
+        self.transforms = transforms_for(rows, cols)
+        self.edge_perms = [edge_permutation(self, t) for t in self.transforms]
+        self.box_perms = [box_permutation(self, t) for t in self.transforms]
+        self.inverse_edge_perms = [inverse(perm) for perm in self.edge_perms]
+        self.sym_edge_keys = [tuple(self.edge_keys[perm[e]] for perm in self.edge_perms)
+                              for e in range(self.num_edges)]
+        self.sym_p1_box_keys = [tuple(self.p1_box_keys[perm[b]] for perm in self.box_perms)
+                                for b in range(self.num_boxes)]
+        self.sym_p2_box_keys = [tuple(self.p2_box_keys[perm[b]] for perm in self.box_perms)
+                                for b in range(self.num_boxes)]
+
+    @classmethod
+    def get(cls, rows: int, cols: int) -> "BoardLayout":
+        layout = cls._cache.get((rows, cols))
+        if layout is None:
+            layout = cls(rows, cols)
+            cls._cache[rows, cols] = layout
+        return layout
+
+    def edge_of(self, action_type: str, position: Tuple[int, int]) -> int:
+        x, y = position
+        if action_type == "row":
+            return y * self.cols + x
+        elif action_type == "col":
+            return self.num_row_edges + y * (self.cols + 1) + x
+        else:
+            raise Exception("Unknown movement type")
+
+    def action_of(self, edge: int) -> GameAction:
+        if edge < self.num_row_edges:
+            y, x = divmod(edge, self.cols)
+            return GameAction("row", (x, y))
+        y, x = divmod(edge - self.num_row_edges, self.cols + 1)
+        return GameAction("col", (x, y))
@@ -5,8 +5,37 @@ class Bot:
     """
     An interface for bot. Inherit it to create your own bots!
     """
+
+    # called with a SearchStats.MoveStats after every move when set
+    stats_hook = None
+
     def get_action(self, state: GameState) -> GameAction:
         """
         Returns action based on state.
         """
         raise NotImplementedError()
+
+    def stop(self):
+        """
+        Asks a get_action running on another thread to return as soon as it
+        has a move. Bots which cannot stop early ignore it.
+        """
+
+    def clear_stop(self):
+        """
+        Forgets an earlier stop. Callers which stop bots call it before
+        get_action rather than the bot on entry, so that a stop landing
+        while the move starts is not lost.
+        """
+        self.stop_requested = False
+
+    def set_stats_hook(self, hook):
+        """
+        Opt in to per-move statistics: hook(stats) is called after every
+        get_action. Pass None to turn them off again.
+        """
+        self.stats_hook = hook
+
+    def report_stats(self, stats):
+        if self.stats_hook is not None:
+            self.stats_hook(stats)
@@ -0,0 +1,115 @@
+"""
+Client for BotServer. Plays a game through a running server with:
+
+    python BotClient.py --port 8765 --bot MinimaxBot:time_limit=0.2
+"""
+
+from argparse import ArgumentParser
+from typing import Optional
+from GameAction import GameAction
+from GameEngine import GameEngine
+from GameState import GameState
+import asyncio
+import itertools
+import json
+
+
+class BotClient:
+    """
+    One connection to a BotServer. Requests may be sent concurrently,
+    responses are matched to them by id.
+    """
+
+    def __init__(self):
+        self.reader = None
+        self.writer = None
+        self.pending = {}
+        self.ids = itertools.count(1)
+        self.listener = None
+
+    async def connect(self, host: str = "127.0.0.1", port: int = 8765):
+        self.reader, self.writer = await asyncio.open_connection(host, port)
+        self.listener = asyncio.create_task(self.listen())
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            await self.writer.wait_closed()
+        if self.listener is not None:
+            self.listener.cancel()
+
+    async def listen(self):
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                break
+            response = json.loads(line)
+            future = self.pending.pop(response.get("id"), None)
+            if future is not None and not future.done():
+                future.set_result(response)
+        for future in self.pending.values():
+            future.set_exception(ConnectionError("server closed the connection"))
+        self.pending = {}
+
+    async def request(self, request: dict) -> dict:
+        request_id = next(self.ids)
+        future = asyncio.get_running_loop().create_future()
+        self.pending[request_id] = future
+        self.writer.write(json.dumps(dict(request, id=request_id)).encode() + b"\n")
+        await self.writer.drain()
+        response = await future
+        if "error" in response:
+            raise RuntimeError(response["error"])
+        return response
+
+    async def get_action(self, state: GameState, session: Optional[str] = None,
+                         bot: Optional[str] = None, time_limit: Optional[float] = None) -> GameAction:
+        request = {"op": "move", "state": state.to_dict()}
+        if session is not None:
+            request["session"] = session
+        if bot is not None:
+            request["bot"] = bot
+        if time_limit is not None:
+            request["time_limit"] = time_limit
+        response = await self.request(request)
+        action_type, position = response["action"]
+        return GameAction(action_type, tuple(position))
+
+    async def close_session(self, session: str) -> bool:
+        response = await self.request({"op": "close", "session": session})
+        return response["closed"]
+
+
+async def play_remote_game(client: BotClient, session: str, bot: Optional[str] = None,
+                           number_of_dots: int = 4, time_limit: Optional[float] = None):
+    """
+    Both sides are played by the session's bot. Returns the scores.
+    """
+    engine = GameEngine(number_of_dots)
+    while not engine.is_gameover():
+        action = await client.get_action(engine.get_state(), session, bot, time_limit)
+        engine.play_action(action)
+    await client.close_session(session)
+    return engine.scores()
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Play games through a BotServer.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--bot", default=None, help="bot spec, default the server's")
+    parser.add_argument("--dots", type=int, default=4)
+    parser.add_argument("--games", type=int, default=1, help="games played at the same time")
+    parser.add_argument("--time-limit", type=float, default=None)
+    args = parser.parse_args()
+
+    async def main():
+        client = BotClient()
+        await client.connect(args.host, args.port)
+        games = [play_remote_game(client, "game-{}".format(i), args.bot, args.dots, args.time_limit)
+                 for i in range(args.games)]
+        for i, scores in enumerate(await asyncio.gather(*games)):
+            print("game {}: {} - {}".format(i, *scores))
+        await client.close()
+
+    asyncio.run(main())
@@ -0,0 +1,104 @@
+from Bitboard import Bitboard
+from Bot import Bot
+from concurrent.futures import Future, ThreadPoolExecutor
+from GameAction import GameAction
+from GameState import GameState
+import threading
+
+
+def position_key(state: GameState) -> int:
+    return Bitboard.from_state(state).hash
+
+
+class BotRunner:
+    """
+    Runs bot moves on a worker thread, so that the Tkinter event loop keeps
+    running while a bot searches. request returns a Future which the
+    window polls with after().
+
+    cancel discards every running and queued move, e.g. when a new game is
+    started, and asks the running bot to stop (see Bot.stop).
+
+    With pondering, ponder(bot, state) uses the time while a human decides
+    on state to compute the bot's reply to each of the human's moves, the
+    moves not giving a box away first. When the human plays one of them,
+    request answers at once. Moves and pondering share the one worker, so
+    a bot is never asked for two moves at the same time.
+    """
+
+    def __init__(self, pondering: bool = False):
+        self.pondering = pondering
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        # bots with a move in progress, to stop on cancel
+        self.running = set()
+        # replies found while pondering, keyed by position_key
+        self.replies = {}
+        self.ponder_bot = None
+        self.ponder_cancelled = threading.Event()
+        self.cancelled = threading.Event()
+
+    def request(self, bot: Bot, state: GameState) -> Future:
+        if bot is self.ponder_bot:
+            reply = self.replies.get(position_key(state))
+            self.stop_pondering()
+            if reply is not None:
+                future = Future()
+                future.set_result(reply)
+                return future
+        return self.executor.submit(self.get_action, bot, state, self.cancelled)
+
+    def get_action(self, bot: Bot, state: GameState, cancelled: threading.Event) -> GameAction:
+        self.running.add(bot)
+        try:
+            # a stop from here on is kept, and one before it is seen as cancelled
+            bot.clear_stop()
+            if cancelled.is_set():
+                return None
+            return bot.get_action(state)
+        finally:
+            self.running.discard(bot)
+
+    def ponder(self, bot: Bot, state: GameState):
+        """
+        Starts computing replies of bot to the moves of the human to move
+        in state. Does nothing unless pondering is on.
+        """
+        if not self.pondering:
+            return
+        self.stop_pondering()
+        self.ponder_bot = bot
+        self.ponder_cancelled = threading.Event()
+        self.replies = {}
+        self.executor.submit(self.ponder_replies, bot, state, self.replies, self.ponder_cancelled)
+
+    def ponder_replies(self, bot: Bot, state: GameState, replies: dict, cancelled: threading.Event):
+        board = Bitboard.from_state(state)
+        moves = sorted(board.free_edges(), key=board.creates_three_sided_box)
+        for edge in moves:
+            if cancelled.is_set():
+                return
+            taken = board.make_move(edge)
+            # after taking a box the human moves again, there is nothing to reply to
+            if not taken and not board.is_final():
+                reply = self.get_action(bot, board.to_state(), cancelled)
+                if reply is not None:
+                    replies[board.hash] = reply
+            board.unmake_move()
+
+    def stop_pondering(self):
+        self.ponder_cancelled.set()
+        if self.ponder_bot is not None and self.ponder_bot in self.running:
+            self.ponder_bot.stop()
+        self.ponder_bot = None
+        self.replies = {}
+
+    def cancel(self):
+        self.stop_pondering()
+        self.cancelled.set()
+        for bot in list(self.running):
+            bot.stop()
+        self.cancelled = threading.Event()
+
+    def shutdown(self):
+        self.cancel()
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,364 @@
+"""
+Serves bot moves over a local socket, one JSON object per line. Start it
+with, for example:
+
+    python BotServer.py --port 8765 --bot MinimaxBot:time_limit=0.5
+
+Requests and responses:
+
+    {"id": 1, "session": "game-42", "bot": "MinimaxBot", "state": {...}, "time_limit": 0.5}
+    {"id": 1, "action": ["row", [0, 2]], "time": 0.48}
+
+    {"id": 2, "op": "close", "session": "game-42"}
+    {"id": 2, "closed": true}
+
+state is GameState.to_dict(). Every session keeps its own bot, built from
+the "bot" spec (as in Tournament.py) or the server default, so its
+transposition table and search tree stay warm between moves. Clients may
+only ask for the bots and arguments of SERVED_BOTS. time_limit must be a
+positive number and is capped at MAX_TIME_LIMIT. A failed request gets
+{"id": ..., "error": "..."}. See BotClient for a client.
+"""
+
+from argparse import ArgumentParser
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from Bot import Bot
+from GameState import GameState
+from LocalSearchBot import LocalSearchBot
+from MCTSBot import MCTSBot
+from MinimaxBot import MinimaxBot
+from RandomBot import RandomBot
+from Tournament import make_bot, parse_spec
+import asyncio
+import json
+import math
+import time
+
+# extra seconds a move may take over its time limit before it is stopped
+GRACE_PERIOD = 0.25
+
+# longest time_limit a client may ask for, per move or in a bot spec
+MAX_TIME_LIMIT = 60.0
+
+# bots clients may ask for, with the arguments they may set: numbers up to
+# the given maximum, or any literal for None. Worker processes, books and
+# evaluation files are only set by the server's own --bot.
+SERVED_BOTS = {
+    "MinimaxBot": (MinimaxBot, {
+        "time_limit": MAX_TIME_LIMIT, "max_depth": 64, "tt_size": 1 << 20, "move_ordering": None,
+        "endgame": None, "seed": None, "symmetry": None, "search_mode": None, "aspiration": 100.0}),
+    "MCTSBot": (MCTSBot, {
+        "iterations": 1000000, "time_limit": MAX_TIME_LIMIT, "exploration": 100.0, "seed": None,
+        "rollout_batch": 1024}),
+    "LocalSearchBot": (LocalSearchBot, {}),
+    "RandomBot": (RandomBot, {}),
+}
+
+
+def make_client_bot(spec: str) -> Bot:
+    """
+    Builds a bot from a spec sent by a client, as make_bot but only from
+    SERVED_BOTS and with the arguments checked.
+    """
+    name, kwargs = parse_spec(spec)
+    if name not in SERVED_BOTS:
+        raise ValueError("unknown bot {}, served bots are {}".format(name, ", ".join(SERVED_BOTS)))
+    cls, allowed = SERVED_BOTS[name]
+    for key, value in kwargs.items():
+        if key not in allowed:
+            raise ValueError("{} takes no argument {} from clients".format(name, key))
+        if not isinstance(value, (bool, int, float, str, type(None))):
+            raise ValueError("{} must be a number, a string, a bool or None".format(key))
+        limit = allowed[key]
+        if limit is not None and (isinstance(value, (bool, str, type(None)))
+                                  or not 0 <= value <= limit):
+            raise ValueError("{} must be a number from 0 to {}".format(key, limit))
+    return cls(**kwargs)
+
+
+def parse_time_limit(value, default: float) -> float:
+    if value is None:
+        return default
+    if isinstance(value, bool) or not isinstance(value, (int, float)) \
+            or not math.isfinite(value) or value <= 0:
+        raise ValueError("time_limit must be a positive number, not {!r}".format(value))
+    return min(float(value), MAX_TIME_LIMIT)
+
+
+class Session:
+    """
+    A warm bot. lock makes the moves of one session run one at a time.
+    pending counts the moves queued or running; a closed session's bot is
+    closed once it has none.
+    """
+
+    def __init__(self, spec: str, bot: Bot):
+        self.spec = spec
+        self.bot = bot
+        self.lock = asyncio.Lock()
+        self.moves = 0
+        self.pending = 0
+        self.closed = False
+
+    def close(self):
+        """
+        Stops the bot, and closes it now or after its last pending move.
+        """
+        self.closed = True
+        self.bot.stop()
+        if self.pending == 0 and hasattr(self.bot, "close"):
+            self.bot.close()
+
+
+class MoveRequest:
+    def __init__(self, session: Session, state: GameState, time_limit: float):
+        self.session = session
+        self.state = state
+        self.time_limit = time_limit
+        self.deadline = time.monotonic() + time_limit
+        self.future = asyncio.get_running_loop().create_future()
+
+
+class BotServer:
+    """
+    asyncio server for bot moves.
+
+    Requests are queued and collected into batches: the first request
+    waits batch_window seconds for others, then the batch is split by
+    session and each session's moves run back to back in one call on the
+    thread pool. Sessions run in parallel up to workers threads.
+
+    Every move gets at most its time_limit (default_time_limit if not
+    given). Bots with a time_limit attribute search within it, and a move
+    still running GRACE_PERIOD after its limit is stopped (see Bot.stop)
+    and answered with an error.
+
+    At most max_sessions sessions are kept, the least recently used
+    without a pending move is dropped first. Requests without a session
+    get a bot of their own, closed after the move.
+    """
+
+    def __init__(self, default_bot: str = "MinimaxBot", workers: int = 4,
+                 batch_window: float = 0.002, max_batch: int = 64,
+                 default_time_limit: float = 1.0, max_sessions: int = 256):
+        self.default_bot = default_bot
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.default_time_limit = default_time_limit
+        self.max_sessions = max_sessions
+        self.executor = ThreadPoolExecutor(workers)
+        self.sessions = OrderedDict()
+        self.queue = None
+        self.server = None
+        self.dispatcher = None
+        # run_moves tasks, referenced until they finish
+        self.tasks = set()
+        # batches dispatched and requests answered, for monitoring
+        self.batches = 0
+        self.requests = 0
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8765):
+        self.queue = asyncio.Queue()
+        self.dispatcher = asyncio.create_task(self.dispatch())
+        self.server = await asyncio.start_server(self.handle_connection, host, port)
+        return self.server
+
+    @property
+    def port(self) -> int:
+        return self.server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        if self.dispatcher is not None:
+            self.dispatcher.cancel()
+        for session in self.sessions.values():
+            session.close()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        # requests of one connection are answered as they finish, not in order
+        write_lock = asyncio.Lock()
+        tasks = set()
+
+        async def respond(line):
+            response = await self.handle_line(line)
+            async with write_lock:
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                task = asyncio.create_task(respond(line))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def handle_line(self, line: bytes) -> dict:
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get("id")
+            response = await self.handle(request)
+        except Exception as error:
+            response = {"error": "{}: {}".format(type(error).__name__, error)}
+        response["id"] = request_id
+        self.requests += 1
+        return response
+
+    async def handle(self, request: dict) -> dict:
+        op = request.get("op", "move")
+        if op == "close":
+            session = self.sessions.pop(request.get("session"), None)
+            if session is not None:
+                session.close()
+            return {"closed": session is not None}
+        if op != "move":
+            raise ValueError("unknown op " + op)
+
+        state = GameState.from_dict(request["state"])
+        time_limit = parse_time_limit(request.get("time_limit"), self.default_time_limit)
+        session_id = request.get("session")
+        session = self.get_session(session_id, request.get("bot"))
+        move = MoveRequest(session, state, time_limit)
+        session.pending += 1
+        await self.queue.put(move)
+        try:
+            # on timeout the future is cancelled, and its result dropped when it comes
+            action, elapsed = await asyncio.wait_for(move.future, time_limit + GRACE_PERIOD)
+        except asyncio.TimeoutError:
+            session.bot.stop()
+            raise TimeoutError("no move within {:.3f} s".format(time_limit))
+        finally:
+            if session_id is None:
+                session.close()
+        return {"action": [action.action_type, [int(v) for v in action.position]], "time": elapsed}
+
+    def new_session(self, spec: Optional[str]) -> Session:
+        if spec is None:
+            return Session(self.default_bot, make_bot(self.default_bot))
+        return Session(spec, make_client_bot(spec))
+
+    def get_session(self, session_id: Optional[str], spec: Optional[str]) -> Session:
+        if session_id is None:
+            # a throwaway session for one request
+            return self.new_session(spec)
+        session = self.sessions.get(session_id)
+        if session is None:
+            session = self.new_session(spec)
+            self.evict()
+            self.sessions[session_id] = session
+        elif spec is not None and session.spec != spec:
+            raise ValueError("session {} plays {}, not {}".format(session_id, session.spec, spec))
+        self.sessions.move_to_end(session_id)
+        return session
+
+    # makes room for one more session; those with a pending move are kept
+    # even over max_sessions
+    def evict(self):
+        idle = [key for key, session in self.sessions.items() if session.pending == 0]
+        for key in idle[:len(self.sessions) + 1 - self.max_sessions]:
+            self.sessions.pop(key).close()
+
+    async def dispatch(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            end = loop.time() + self.batch_window
+            while len(batch) < self.max_batch:
+                remaining = end - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            self.batches += 1
+
+            by_session = {}
+            for move in batch:
+                by_session.setdefault(id(move.session), []).append(move)
+            for moves in by_session.values():
+                task = asyncio.create_task(self.run_moves(moves))
+                self.tasks.add(task)
+                task.add_done_callback(self.tasks.discard)
+
+    async def run_moves(self, moves: list):
+        session = moves[0].session
+        loop = asyncio.get_running_loop()
+        async with session.lock:
+            try:
+                results = await loop.run_in_executor(self.executor, play_moves, session, moves)
+            finally:
+                session.pending -= len(moves)
+                if session.closed and session.pending == 0 and hasattr(session.bot, "close"):
+                    session.bot.close()
+        for move, result in zip(moves, results):
+            if move.future.done():
+                continue
+            if isinstance(result, Exception):
+                move.future.set_exception(result)
+            else:
+                move.future.set_result(result)
+
+
+# runs on the thread pool: the moves of one session, one after the other
+def play_moves(session: Session, moves: list) -> list:
+    bot = session.bot
+    results = []
+    for move in moves:
+        # cleared before closed is read, so that a close from now on stops the move
+        bot.clear_stop()
+        if session.closed:
+            results.append(RuntimeError("session closed"))
+            continue
+        remaining = move.deadline - time.monotonic()
+        if remaining <= 0:
+            results.append(TimeoutError("time limit passed while queued"))
+            continue
+        limit = getattr(bot, "time_limit", None)
+        if limit is not None:
+            bot.time_limit = min(limit, remaining)
+        start = time.perf_counter()
+        try:
+            results.append((bot.get_action(move.state), time.perf_counter() - start))
+        except Exception as error:
+            results.append(error)
+        finally:
+            if limit is not None:
+                bot.time_limit = limit
+        session.moves += 1
+    return results
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Serve bot moves as JSON lines over TCP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--bot", default="MinimaxBot", help="default bot spec, as in Tournament.py")
+    parser.add_argument("--workers", type=int, default=4, help="threads running bot moves")
+    parser.add_argument("--time-limit", type=float, default=1.0, help="default seconds per move")
+    args = parser.parse_args()
+
+    async def main():
+        server = BotServer(args.bot, args.workers, default_time_limit=args.time_limit)
+        await server.start(args.host, args.port)
+        print("serving {} on {}:{}".format(args.bot, args.host, server.port))
+        await server.serve_forever()
+
+    asyncio.run(main())
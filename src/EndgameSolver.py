@@ -0,0 +1,231 @@
+from Bitboard import Bitboard
+from functools import lru_cache
+from typing import List, NamedTuple, Optional, Tuple
+
+
+class Component(NamedTuple):
+    """
+    A chain or loop of boxes which are not taken yet.
+
+    boxes: box indices in order along the component. For opened components
+        the first box is the one which can be taken right now.
+    edges: free edges between consecutive boxes, edges[i] joins boxes[i]
+        and boxes[i + 1] (and the last box back to the first for loops).
+    ends: free edges from the end boxes to the border of the board, at
+        most one per end.
+    loop: True for loops, False for chains.
+    opened: number of ends which have a three-sided box (0, 1 or 2).
+    """
+
+    boxes: Tuple[int, ...]
+    edges: Tuple[int, ...]
+    ends: Tuple[int, ...]
+    loop: bool
+    opened: int
+
+
+class EndgameSolution(NamedTuple):
+    """
+    value: boxes the player to move gains over the opponent from the rest of
+        the game, with both sides playing perfectly.
+    edge: the move to play.
+    """
+
+    value: int
+    edge: int
+
+
+@lru_cache(maxsize=None)
+def value_to_open(chains: Tuple[int, ...], loops: Tuple[int, ...]) -> int:
+    """
+    Net boxes for the player who has to open one of the given chains and
+    loops (lengths, sorted), the opponent keeping control where it pays.
+    """
+    if not chains and not loops:
+        return 0
+
+    best = None
+    for i, n in enumerate(chains):
+        if i > 0 and chains[i - 1] == n:
+            continue
+        rest = value_to_open(chains[:i] + chains[i + 1:], loops)
+        if n <= 2:
+            # a two-chain is opened in the middle so it cannot be declined
+            opponent = n + rest
+        else:
+            opponent = max(n + rest, n - 4 - rest)
+        if best is None or -opponent > best:
+            best = -opponent
+
+    for i, m in enumerate(loops):
+        if i > 0 and loops[i - 1] == m:
+            continue
+        rest = value_to_open(chains, loops[:i] + loops[i + 1:])
+        opponent = max(m + rest, m - 8 - rest)
+        if best is None or -opponent > best:
+            best = -opponent
+
+    return best
+
+
+class EndgameSolver:
+    """
+    Exact play once every free edge would give a box away.
+
+    The board must only have untaken boxes with two or three sides marked.
+    Such a position splits into independent chains and loops, which are
+    solved with the long chain rule: the player in control takes every box
+    offered except for the last two of a chain (four of a loop) when giving
+    those away keeps control for the rest of the game.
+
+    solve returns None for positions outside this shape, e.g. while safe
+    moves remain or when a box joins three or more others.
+    """
+
+    def decompose(self, board: Bitboard) -> Optional[List[Component]]:
+        layout = board.layout
+        taken = board.p1_boxes | board.p2_boxes
+
+        # free edges of every untaken box, split into neighbours and border
+        neighbours = {}
+        border = {}
+        for b in range(layout.num_boxes):
+            if taken >> b & 1:
+                continue
+            sides = board.box_sides(b)
+            if sides < 2:
+                return None
+            neighbours[b] = []
+            border[b] = []
+        for e in board.free_edges():
+            boxes = layout.edge_boxes[e]
+            if len(boxes) == 1:
+                border[boxes[0]].append(e)
+            else:
+                a, b = boxes
+                neighbours[a].append((b, e))
+                neighbours[b].append((a, e))
+
+        components = []
+        visited = set()
+
+        def walk(start):
+            boxes = [start]
+            edges = []
+            visited.add(start)
+            previous = None
+            current = start
+            while True:
+                step = [(b, e) for b, e in neighbours[current] if e != previous]
+                if not step:
+                    return boxes, edges, False
+                nxt, e = step[0]
+                if nxt == start:
+                    edges.append(e)
+                    return boxes, edges, True
+                edges.append(e)
+                boxes.append(nxt)
+                visited.add(nxt)
+                previous = e
+                current = nxt
+
+        # paths start at an end: a three-sided box or a box on the border
+        starts = sorted(neighbours, key=lambda b: board.box_sides(b) != 3)
+        for b in starts:
+            if b in visited:
+                continue
+            is_end = board.box_sides(b) == 3 or len(border[b]) > 0
+            if not is_end:
+                continue
+            boxes, edges, _ = walk(b)
+            first, last = boxes[0], boxes[-1]
+            opened = (board.box_sides(first) == 3) + (len(boxes) > 1 and board.box_sides(last) == 3)
+            ends = tuple(border[first]) + (tuple(border[last]) if len(boxes) > 1 else ())
+            components.append(Component(tuple(boxes), tuple(edges), ends, False, opened))
+
+        for b in neighbours:
+            if b in visited:
+                continue
+            boxes, edges, loop = walk(b)
+            if not loop:
+                return None
+            components.append(Component(tuple(boxes), tuple(edges), (), True, 0))
+
+        return components
+
+    def solve(self, board: Bitboard) -> Optional[EndgameSolution]:
+        components = self.decompose(board)
+        if not components:
+            return None
+
+        opened = [c for c in components if c.opened]
+        closed = [c for c in components if not c.opened]
+        chains = tuple(sorted(len(c.boxes) for c in closed if not c.loop))
+        loops = tuple(sorted(len(c.boxes) for c in closed if c.loop))
+
+        if not opened:
+            return self.open_component(closed, chains, loops)
+        return self.take_boxes(opened, chains, loops)
+
+    # the player to move has to give boxes away
+    def open_component(self, closed: List[Component], chains, loops) -> EndgameSolution:
+        best = None
+        for c in closed:
+            n = len(c.boxes)
+            if c.loop:
+                rest = value_to_open(chains, self.remove(loops, n))
+                value = -max(n + rest, n - 8 - rest)
+                edge = c.edges[0]
+            else:
+                rest = value_to_open(self.remove(chains, n), loops)
+                if n <= 2:
+                    value = -(n + rest)
+                else:
+                    value = -max(n + rest, n - 4 - rest)
+                # open a two-chain in the middle, anything else at an end
+                edge = c.edges[0] if n == 2 else (c.ends + c.edges)[0]
+            if best is None or value > best.value:
+                best = EndgameSolution(value, edge)
+        return best
+
+    # boxes are on offer: take them all, or all but a double-cross
+    def take_boxes(self, opened: List[Component], chains, loops) -> EndgameSolution:
+        rest = value_to_open(chains, loops)
+        total = sum(len(c.boxes) for c in opened)
+
+        best_value = total + rest
+        declined = None
+        for c in opened:
+            n = len(c.boxes)
+            if c.opened == 1 and n >= 2:
+                value = total - 4 - rest
+            elif c.opened == 2 and n >= 4:
+                value = total - 8 - rest
+            else:
+                continue
+            if value > best_value:
+                best_value = value
+                declined = c
+
+        # take everything outside the component which is given back
+        for c in opened:
+            if c is not declined:
+                return EndgameSolution(best_value, self.capture_edge(c))
+
+        n = len(declined.boxes)
+        if declined.opened == 1 and n > 2 or declined.opened == 2 and n > 4:
+            return EndgameSolution(best_value, self.capture_edge(declined))
+        if declined.opened == 1:
+            # leave the last two boxes as a double-cross
+            return EndgameSolution(best_value, declined.ends[-1])
+        # leave the last four boxes of a loop as two double-crosses
+        return EndgameSolution(best_value, declined.edges[1])
+
+    def capture_edge(self, c: Component) -> int:
+        if c.edges:
+            return c.edges[0]
+        return c.ends[0]
+
+    def remove(self, lengths: Tuple[int, ...], n: int) -> Tuple[int, ...]:
+        i = lengths.index(n)
+        return lengths[:i] + lengths[i + 1:]
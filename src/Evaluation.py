@@ -0,0 +1,114 @@
+"""
+Weighted leaf evaluation for MinimaxBot, fitted on self-play games (see
+SelfPlay.py).
+
+A position is scored as the final box difference (player 2 minus player
+1) it is expected to end with: a weighted sum of FEATURES. Apart from
+score, the features count for the player to move, so they are negated
+when player 1 is to move.
+"""
+
+from typing import Dict, List
+from Bitboard import Bitboard
+import json
+import numpy as np
+
+FEATURES = [
+    # boxes of player 2 minus boxes of player 1
+    "score",
+    # boxes which can be taken right now
+    "three_sided",
+    # chains and loops of three or more two-sided boxes
+    "long_chains",
+    # chains of one or two two-sided boxes
+    "short_chains",
+    # 1 if free edges plus long chains is even, -1 if odd (long chain rule)
+    "parity",
+    # 1, the value of having the move
+    "tempo",
+]
+
+
+def chain_lengths(board: Bitboard) -> List[int]:
+    """
+    Sizes of the groups of untaken two-sided boxes joined by free edges.
+    """
+    layout = board.layout
+    two_sided = 0
+    for b, sides in enumerate(board.moves.sides):
+        if sides == 2:
+            two_sided |= 1 << b
+
+    parent = {}
+
+    def find(b):
+        while parent.get(b, b) != b:
+            b = parent[b]
+        return b
+
+    for e in board.free_edges():
+        boxes = layout.edge_boxes[e]
+        if len(boxes) == 2 and two_sided >> boxes[0] & 1 and two_sided >> boxes[1] & 1:
+            a, b = find(boxes[0]), find(boxes[1])
+            if a != b:
+                parent[a] = b
+
+    sizes = {}
+    for b in range(layout.num_boxes):
+        if two_sided >> b & 1:
+            root = find(b)
+            sizes[root] = sizes.get(root, 0) + 1
+    return list(sizes.values())
+
+
+def features(board: Bitboard) -> List[float]:
+    sign = -1 if board.player1_turn else 1
+    lengths = chain_lengths(board)
+    long_chains = sum(1 for n in lengths if n >= 3)
+    short_chains = len(lengths) - long_chains
+    parity = 1 if (board.num_free_edges() + long_chains) % 2 == 0 else -1
+    return [board.score, sign * board.three_sided, sign * long_chains,
+            sign * short_chains, sign * parity, sign]
+
+
+class WeightedEvaluation:
+    """
+    Callable scoring a Bitboard with fitted weights, one per feature.
+    Final positions get their exact score.
+    """
+
+    def __init__(self, weights: Dict[str, float], info: Dict = None):
+        self.weights = dict(weights)
+        self.vector = [self.weights.get(name, 0.0) for name in FEATURES]
+        # how the weights were fitted
+        self.info = info or {}
+
+    def __call__(self, board: Bitboard) -> float:
+        if board.is_final():
+            return board.score
+        return sum(w * f for w, f in zip(self.vector, features(board)))
+
+    @classmethod
+    def load(cls, path: str) -> "WeightedEvaluation":
+        with open(path) as f:
+            data = json.load(f)
+        return cls(data["weights"], data.get("info"))
+
+    def save(self, path: str):
+        with open(path, "w") as f:
+            json.dump({"features": FEATURES, "weights": self.weights, "info": self.info}, f, indent=1)
+            f.write("\n")
+
+
+def fit(X: np.ndarray, y: np.ndarray, ridge: float = 1e-3) -> WeightedEvaluation:
+    """
+    Least squares fit of final scores y on feature rows X, with a small
+    ridge penalty so that rare features stay bounded.
+    """
+    n = X.shape[1]
+    A = X.T @ X + ridge * len(X) * np.eye(n)
+    w = np.linalg.solve(A, X.T @ y)
+    residual = y - X @ w
+    r2 = 1 - residual.var() / y.var() if y.var() > 0 else 0.0
+    info = {"positions": int(len(X)), "r2": float(r2), "rmse": float(np.sqrt((residual ** 2).mean()))}
+    return WeightedEvaluation(dict(zip(FEATURES, w.tolist())), info)
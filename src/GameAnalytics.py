@@ -0,0 +1,258 @@
+"""
+Statistics over large GameRecord archives, without loading them: win
+rates of the first player, the distribution of move times and the
+positions most often met by players who went on to lose.
+
+Records are streamed from each shard and replayed by ReplayEngine, and
+shards are analysed in parallel on a process pool:
+
+    python GameAnalytics.py ../selfplay --workers 4
+"""
+
+from argparse import ArgumentParser
+from multiprocessing import Pool
+from typing import Dict, Iterable, List, Optional
+from Bitboard import Bitboard
+from BoardLayout import BoardLayout
+from GameRecord import GameRecord, read_records
+from SelfPlay import shard_paths
+import json
+import numpy as np
+
+# move time histogram bins in seconds, log spaced from 10 us to 100 s
+TIME_BINS = np.concatenate([[0.0], np.logspace(-5, 2, 29), [np.inf]])
+
+
+class ReplayEngine:
+    """
+    The rules of GameEngine.update_board on plain ints: marking an edge
+    adds a side to the boxes beside it, a box with four sides goes to the
+    player who marked it, and that player moves again.
+    """
+
+    __slots__ = ("layout", "sides", "edges", "p1_boxes", "p2_boxes", "player1_turn")
+
+    def __init__(self, layout: BoardLayout, player1_turn: bool = True):
+        self.layout = layout
+        self.sides = [0] * layout.num_boxes
+        self.edges = 0
+        self.p1_boxes = 0
+        self.p2_boxes = 0
+        self.player1_turn = player1_turn
+
+    def play(self, edge: int) -> int:
+        """
+        Marks edge, returns the number of boxes completed.
+        """
+        self.edges |= 1 << edge
+        sides = self.sides
+        completed = 0
+        for b in self.layout.edge_boxes[edge]:
+            sides[b] += 1
+            if sides[b] == 4:
+                completed |= 1 << b
+        if completed:
+            if self.player1_turn:
+                self.p1_boxes |= completed
+            else:
+                self.p2_boxes |= completed
+        else:
+            self.player1_turn = not self.player1_turn
+        return completed.bit_count()
+
+    def key(self) -> tuple:
+        return (self.layout.rows, self.layout.cols, self.edges, self.p1_boxes,
+                self.p2_boxes, self.player1_turn)
+
+
+class RecordStats:
+    """
+    Aggregates of any number of records, merged across shards with merge.
+
+    positions counts, for the positions reached within the first max_ply
+    moves of a game, how often each was met with a move to make and how
+    often the player to move lost that game. Only the max_positions most
+    often lost positions are kept whenever the table grows past twice
+    that, so once it does, counts are approximate: a position dropped
+    early loses the counts it had, and the result depends on the order in
+    which records and shards are added.
+    """
+
+    def __init__(self, max_ply: int = 12, max_positions: int = 10000):
+        self.max_ply = max_ply
+        self.max_positions = max_positions
+        self.games = 0
+        self.moves = 0
+        self.boards: Dict[str, int] = {}
+        # results of the player who moved first
+        self.first_player = {"wins": 0, "losses": 0, "draws": 0}
+        self.time_counts = np.zeros(len(TIME_BINS) - 1, dtype=np.int64)
+        self.timed_moves = 0
+        self.time_total = 0.0
+        self.time_max = 0.0
+        # position key: [times met, times lost]
+        self.positions: Dict[tuple, List[int]] = {}
+
+    def add_chunk(self, records: List[GameRecord]):
+        times = [record.times for record in records if record.times is not None]
+        if times:
+            self.add_times(np.concatenate(times))
+        for record in records:
+            self.add(record)
+        self.prune()
+
+    def add(self, record: GameRecord):
+        layout = record.layout
+        engine = ReplayEngine(layout, record.player1_starts)
+        visited = []
+        for ply, edge in enumerate(record.moves):
+            if ply < self.max_ply:
+                visited.append(engine.key())
+            engine.play(edge)
+        p1, p2 = engine.p1_boxes.bit_count(), engine.p2_boxes.bit_count()
+
+        self.games += 1
+        self.moves += len(record.moves)
+        size = "{}x{}".format(layout.rows, layout.cols)
+        self.boards[size] = self.boards.get(size, 0) + 1
+        first, second = (p1, p2) if record.player1_starts else (p2, p1)
+        result = "wins" if first > second else "losses" if first < second else "draws"
+        self.first_player[result] += 1
+
+        positions = self.positions
+        for key in visited:
+            player1_turn = key[-1]
+            lost = p1 < p2 if player1_turn else p2 < p1
+            counts = positions.get(key)
+            if counts is None:
+                counts = positions[key] = [0, 0]
+            counts[0] += 1
+            counts[1] += lost
+
+    def add_times(self, times: np.ndarray):
+        self.time_counts += np.histogram(times, TIME_BINS)[0]
+        self.timed_moves += len(times)
+        self.time_total += float(times.sum())
+        self.time_max = max(self.time_max, float(times.max()))
+
+    def prune(self):
+        if len(self.positions) > 2 * self.max_positions:
+            kept = sorted(self.positions.items(), key=lambda item: -item[1][1])[:self.max_positions]
+            self.positions = dict(kept)
+
+    def merge(self, other: "RecordStats"):
+        self.games += other.games
+        self.moves += other.moves
+        for size, games in other.boards.items():
+            self.boards[size] = self.boards.get(size, 0) + games
+        for result, games in other.first_player.items():
+            self.first_player[result] += games
+        self.time_counts += other.time_counts
+        self.timed_moves += other.timed_moves
+        self.time_total += other.time_total
+        self.time_max = max(self.time_max, other.time_max)
+        for key, (met, lost) in other.positions.items():
+            counts = self.positions.setdefault(key, [0, 0])
+            counts[0] += met
+            counts[1] += lost
+        self.prune()
+
+    def time_quantile(self, q: float) -> float:
+        """
+        Upper edge of the histogram bin holding the q quantile.
+        """
+        if self.timed_moves == 0:
+            return 0.0
+        i = int(np.searchsorted(np.cumsum(self.time_counts), q * self.timed_moves))
+        return min(float(TIME_BINS[i + 1]), self.time_max)
+
+    def summary(self, top: int = 10) -> dict:
+        games = max(self.games, 1)
+        losing = sorted(self.positions.items(), key=lambda item: (-item[1][1], -item[1][0]))[:top]
+        return {
+            "games": self.games,
+            "moves": self.moves,
+            "boards": self.boards,
+            "first_player": {result: count / games for result, count in self.first_player.items()},
+            "move_time": {
+                "moves": self.timed_moves,
+                "mean": self.time_total / self.timed_moves if self.timed_moves else 0.0,
+                "p50": self.time_quantile(0.5),
+                "p90": self.time_quantile(0.9),
+                "p99": self.time_quantile(0.99),
+                "max": self.time_max,
+                "histogram": {"{:.2e}".format(TIME_BINS[i + 1]): int(count)
+                              for i, count in enumerate(self.time_counts) if count},
+            },
+            # position is Bitboard.to_bytes() in hex
+            "losing_positions": [{"position": position_hex(key), "met": met, "lost": lost,
+                                  "loss_rate": lost / met} for key, (met, lost) in losing],
+        }
+
+
+def position_hex(key: tuple) -> str:
+    rows, cols, edges, p1_boxes, p2_boxes, player1_turn = key
+    return Bitboard(BoardLayout.get(rows, cols), edges, p1_boxes, p2_boxes, player1_turn).to_bytes().hex()
+
+
+def chunks(records: Iterable[GameRecord], size: int) -> Iterable[List[GameRecord]]:
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def analyze_file(path: str, chunk_size: int = 10000, max_ply: int = 12,
+                 max_positions: int = 10000) -> RecordStats:
+    stats = RecordStats(max_ply, max_positions)
+    for chunk in chunks(read_records(path), chunk_size):
+        stats.add_chunk(chunk)
+    return stats
+
+
+# runs in the pool
+def _analyze_file(args):
+    return analyze_file(*args)
+
+
+def analyze(paths: List[str], workers: Optional[int] = None, chunk_size: int = 10000,
+            max_ply: int = 12, max_positions: int = 10000) -> RecordStats:
+    """
+    Analyses every shard, in parallel unless workers is 1. The results are
+    merged in the order of paths whatever order shards finish in, so the
+    summary does not depend on workers.
+    """
+    total = RecordStats(max_ply, max_positions)
+    jobs = [(path, chunk_size, max_ply, max_positions) for path in paths]
+    if workers == 1:
+        for job in jobs:
+            total.merge(_analyze_file(job))
+    else:
+        with Pool(workers) as pool:
+            for part in pool.imap(_analyze_file, jobs):
+                total.merge(part)
+    return total
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Statistics over GameRecord files.")
+    parser.add_argument("shards", nargs="+", help="record files or directories of them")
+    parser.add_argument("--workers", type=int, default=None, help="processes, default one per CPU")
+    parser.add_argument("--chunk-size", type=int, default=10000, help="records aggregated at a time")
+    parser.add_argument("--max-ply", type=int, default=12, help="moves into a game positions are counted")
+    parser.add_argument("--top", type=int, default=10, help="losing positions listed")
+    parser.add_argument("--out", default=None, help="also write the summary to this JSON file")
+    args = parser.parse_args()
+
+    paths = [path for shard in args.shards for path in shard_paths(shard)]
+    stats = analyze(paths, args.workers, args.chunk_size, args.max_ply)
+    summary = stats.summary(args.top)
+    print(json.dumps(summary, indent=1))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(summary, f, indent=1)
+            f.write("\n")
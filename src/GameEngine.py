@@ -0,0 +1,104 @@
+from GameAction import GameAction
+from GameState import GameState
+import numpy as np
+
+
+class GameEngine:
+    """
+    Headless Dots and Boxes rules, shared by the Tkinter game in main.py
+    and the tournament runner.
+
+    board_status, row_status and col_status follow the GameState
+    conventions. The turn only passes to the other player when a move
+    does not complete a box.
+    """
+
+    def __init__(self, number_of_dots: int = 4, player1_turn: bool = True):
+        self.number_of_dots = number_of_dots
+        state = GameState.new(number_of_dots, player1_turn)
+        self.board_status = state.board_status
+        self.row_status = state.row_status
+        self.col_status = state.col_status
+        self.player1_turn = player1_turn
+        self.pointsScored = False
+
+    def is_grid_occupied(self, logical_position, type):
+        x = logical_position[0]
+        y = logical_position[1]
+        occupied = True
+
+        if type == 'row' and self.row_status[y][x] == 0:
+            occupied = False
+        if type == 'col' and self.col_status[y][x] == 0:
+            occupied = False
+
+        return occupied
+
+    def pointScored(self):
+        self.pointsScored = True
+
+    def update_board(self, type, logical_position):
+        x = logical_position[0]
+        y = logical_position[1]
+        val = 1
+        playerModifier = 1
+        if self.player1_turn:
+            playerModifier = -1
+
+        if y < (self.number_of_dots-1) and x < (self.number_of_dots-1):
+            self.board_status[y][x] = (
+                abs(self.board_status[y][x]) + val) * playerModifier
+            if abs(self.board_status[y][x]) == 4:
+                self.pointScored()
+
+        if type == 'row':
+            self.row_status[y][x] = 1
+            if y >= 1:
+                self.board_status[y-1][x] = (abs(self.board_status[y-1]
+                                             [x]) + val) * playerModifier
+                if abs(self.board_status[y-1][x]) == 4:
+                    self.pointScored()
+
+        elif type == 'col':
+            self.col_status[y][x] = 1
+            if x >= 1:
+                self.board_status[y][x -
+                                     1] = (abs(self.board_status[y][x-1]) + val) * playerModifier
+                if abs(self.board_status[y][x-1]) == 4:
+                    self.pointScored()
+
+    def play(self, type, logical_position) -> bool:
+        """
+        Marks the edge for the player to move and passes the turn unless a
+        box was completed. Returns whether a box was completed.
+        """
+        self.update_board(type, logical_position)
+        scored = self.pointsScored
+        self.player1_turn = (
+            not self.player1_turn) if not scored else self.player1_turn
+        self.pointsScored = False
+        return scored
+
+    def play_action(self, action: GameAction) -> bool:
+        if self.is_grid_occupied(action.position, action.action_type):
+            raise Exception("Edge is already marked: " + str(action))
+        return self.play(action.action_type, action.position)
+
+    def is_gameover(self):
+        return (self.row_status == 1).all() and (self.col_status == 1).all()
+
+    def get_state(self) -> GameState:
+        return GameState(
+            self.board_status.copy(),
+            self.row_status.copy(),
+            self.col_status.copy(),
+            self.player1_turn
+        )
+
+    def scores(self):
+        """
+        Returns (player 1 boxes, player 2 boxes).
+        """
+        player1_score = len(np.argwhere(self.board_status == -4))
+        player2_score = len(np.argwhere(self.board_status == 4))
+        return player1_score, player2_score
@@ -0,0 +1,155 @@
+"""
+Compact binary game records: the board size, who started and the move
+sequence, optionally with the thinking time of every move. A record is
+self-delimiting, so a file of records is just records one after the
+other:
+
+    write_records("games.bin", records)
+    for record in read_records("games.bin"):
+        ...
+"""
+
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+from Bitboard import Bitboard
+from BoardLayout import BoardLayout
+from GameAction import GameAction
+import struct
+import numpy as np
+
+MAGIC = b"DBGR"
+VERSION = 1
+# magic, version, rows, cols, flags, number of moves
+HEADER = struct.Struct("<4sBBBBH")
+
+PLAYER1_STARTS = 1
+HAS_TIMES = 2
+
+
+class GameRecord(NamedTuple):
+    """
+    moves: edges in BoardLayout numbering, in the order they were played
+    times: seconds spent on every move, or None
+    """
+
+    rows: int
+    cols: int
+    player1_starts: bool
+    moves: Tuple[int, ...]
+    times: Optional[Tuple[float, ...]] = None
+
+    @classmethod
+    def from_actions(cls, number_of_dots: int, actions: List[GameAction], player1_starts: bool = True,
+                     times: Optional[List[float]] = None) -> "GameRecord":
+        layout = BoardLayout.get(number_of_dots - 1, number_of_dots - 1)
+        moves = tuple(layout.edge_of(a.action_type, a.position) for a in actions)
+        return cls(layout.rows, layout.cols, player1_starts, moves,
+                   None if times is None else tuple(times))
+
+    @property
+    def layout(self) -> BoardLayout:
+        return BoardLayout.get(self.rows, self.cols)
+
+    def actions(self) -> List[GameAction]:
+        layout = self.layout
+        return [layout.action_of(edge) for edge in self.moves]
+
+    def boards(self) -> Iterator[Bitboard]:
+        """
+        The position before every move, then the final position. The same
+        Bitboard is updated in place, copy it to keep one.
+        """
+        board = Bitboard(self.layout, player1_turn=self.player1_starts)
+        yield board
+        for edge in self.moves:
+            board.make_move(edge)
+            yield board
+
+    def final_board(self) -> Bitboard:
+        board = Bitboard(self.layout, player1_turn=self.player1_starts)
+        for edge in self.moves:
+            board.make_move(edge)
+        return board
+
+    def scores(self) -> Tuple[int, int]:
+        """
+        Returns (player 1 boxes, player 2 boxes) at the end of the record.
+        """
+        board = self.final_board()
+        return board.p1_boxes.bit_count(), board.p2_boxes.bit_count()
+
+    def to_bytes(self) -> bytes:
+        flags = (PLAYER1_STARTS if self.player1_starts else 0) | (HAS_TIMES if self.times is not None else 0)
+        data = HEADER.pack(MAGIC, VERSION, self.rows, self.cols, flags, len(self.moves))
+        data += np.array(self.moves, dtype=move_dtype(self.layout)).tobytes()
+        if self.times is not None:
+            data += np.array(self.times, dtype="<f4").tobytes()
+        return data
+
+    @classmethod
+    def from_bytes(cls, data: bytes, offset: int = 0) -> Tuple["GameRecord", int]:
+        """
+        Reads the record starting at offset, returns it with the offset
+        just past it.
+        """
+        magic, version, rows, cols, flags, count = HEADER.unpack_from(data, offset)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Not a game record at offset {}".format(offset))
+        offset += HEADER.size
+        dtype = move_dtype(BoardLayout.get(rows, cols))
+        moves = np.frombuffer(data, dtype=dtype, count=count, offset=offset)
+        offset += count * dtype.itemsize
+        times = None
+        if flags & HAS_TIMES:
+            times = np.frombuffer(data, dtype="<f4", count=count, offset=offset)
+            offset += count * 4
+            times = tuple(times.tolist())
+        record = cls(rows, cols, bool(flags & PLAYER1_STARTS), tuple(moves.tolist()), times)
+        return record, offset
+
+
+# one byte per move unless the board has more than 256 edges
+def move_dtype(layout: BoardLayout) -> np.dtype:
+    return np.dtype("u1") if layout.num_edges <= 256 else np.dtype("<u2")
+
+
+def write_records(path: str, records: List[GameRecord], append: bool = True):
+    with open(path, "ab" if append else "wb") as f:
+        for record in records:
+            f.write(record.to_bytes())
+
+
+def record_size(data: bytes, offset: int = 0) -> Optional[int]:
+    """
+    Size in bytes of the record starting at offset, or None if data ends
+    before its header does.
+    """
+    if len(data) - offset < HEADER.size:
+        return None
+    _, _, rows, cols, flags, count = HEADER.unpack_from(data, offset)
+    size = HEADER.size + count * move_dtype(BoardLayout.get(rows, cols)).itemsize
+    if flags & HAS_TIMES:
+        size += count * 4
+    return size
+
+
+def read_records(path: str, buffer_size: int = 1 << 20) -> Iterator[GameRecord]:
+    """
+    Streams the records of a file, reading buffer_size bytes at a time.
+    """
+    with open(path, "rb") as f:
+        data = b""
+        while True:
+            chunk = f.read(buffer_size)
+            data += chunk
+            offset = 0
+            while True:
+                size = record_size(data, offset)
+                if size is None or offset + size > len(data):
+                    break
+                record, offset = GameRecord.from_bytes(data, offset)
+                yield record
+            data = data[offset:]
+            if not chunk:
+                if data:
+                    raise ValueError("Truncated game record at the end of " + path)
+                return
@@ -1,5 +1,6 @@
 from typing import NamedTuple
 from numpy import ndarray
+import numpy as np
 
 class GameState(NamedTuple):
     """
@@ -26,3 +27,48 @@ class GameState(NamedTuple):
     row_status: ndarray
     col_status: ndarray
     player1_turn: bool
+
+    @classmethod
+    def new(cls, number_of_dots: int = 4, player1_turn: bool = True) -> "GameState":
+        """
+        Returns the empty board with number_of_dots dots on each side,
+        that is (number_of_dots - 1) x (number_of_dots - 1) boxes.
+        """
+        return cls(
+            np.zeros(shape=(number_of_dots - 1, number_of_dots - 1), dtype=np.int8),
+            np.zeros(shape=(number_of_dots, number_of_dots - 1), dtype=np.int8),
+            np.zeros(shape=(number_of_dots - 1, number_of_dots), dtype=np.int8),
+            player1_turn
+        )
+
+    def to_dict(self) -> dict:
+        """
+        Plain lists and bools, for JSON.
+        """
+        return {
+            "board_status": np.asarray(self.board_status, dtype=int).tolist(),
+            "row_status": np.asarray(self.row_status, dtype=int).tolist(),
+            "col_status": np.asarray(self.col_status, dtype=int).tolist(),
+            "player1_turn": bool(self.player1_turn),
+        }
+
+    def to_bytes(self) -> bytes:
+        """
+        Bit-packed edges, box owners and turn, see Bitboard.to_bytes. The
+        side counts of boxes not taken yet follow from the edges, so they
+        come back without a sign.
+        """
+        from Bitboard import Bitboard
+
+        return Bitboard.from_state(self).to_bytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "GameState":
+        from Bitboard import Bitboard
+
+        return Bitboard.from_bytes(data).to_state()
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "GameState":
+        return cls(np.array(data["board_status"]), np.array(data["row_status"]),
+                   np.array(data["col_status"]), bool(data["player1_turn"]))
@@ -0,0 +1,250 @@
+from BatchSimulator import BatchSimulator
+from Bitboard import Bitboard
+from Bot import Bot
+from GameAction import GameAction
+from GameState import GameState
+from SearchStats import MoveStats
+from typing import Optional
+import math
+import random
+import time
+
+
+class Node:
+    """
+    A position in the search tree.
+
+    player1_moved: True if player 1 made the move leading here, so wins
+        sums rewards from that player's point of view.
+    untried: edges which have no child yet, in random order. As in the
+        rollouts, only the moves of the highest move_priority are searched:
+        the boxes on offer, or else the safe moves, or else every move.
+    """
+
+    __slots__ = ("edge", "parent", "children", "untried", "player1_moved",
+                 "visits", "wins", "edges", "p1_boxes", "p2_boxes", "player1_turn")
+
+    def __init__(self, board: Bitboard, edge: int = -1, parent: Optional["Node"] = None,
+                 player1_moved: bool = False, rng=random):
+        self.edge = edge
+        self.parent = parent
+        self.children = {}
+        priorities = {e: move_priority(board, e) for e in board.free_edges()}
+        best = max(priorities.values(), default=0)
+        self.untried = [e for e, priority in priorities.items() if priority == best]
+        rng.shuffle(self.untried)
+        self.player1_moved = player1_moved
+        self.visits = 0
+        self.wins = 0.0
+        self.edges = board.edges
+        self.p1_boxes = board.p1_boxes
+        self.p2_boxes = board.p2_boxes
+        self.player1_turn = board.player1_turn
+
+    def matches(self, board: Bitboard) -> bool:
+        return (self.edges == board.edges and self.p1_boxes == board.p1_boxes
+                and self.p2_boxes == board.p2_boxes and self.player1_turn == board.player1_turn)
+
+
+def move_priority(board: Bitboard, edge: int) -> int:
+    """
+    2 for a move taking a box, 1 for one not leaving a three-sided box and
+    0 for one giving a box away, the order in which the rollouts pick moves.
+    """
+    if board.completes_box(edge):
+        return 2
+    if board.creates_three_sided_box(edge):
+        return 0
+    return 1
+
+
+class MCTSBot(Bot):
+    """
+    Monte Carlo tree search with UCT selection.
+
+    Each move runs iterations playouts, or as many as fit in time_limit
+    seconds when it is set. Playouts finish the game on a Bitboard copy,
+    taking a box when one is on offer and otherwise preferring moves which
+    do not leave a three-sided box. With rollout_batch > 1, every iteration
+    plays that many playouts at once from the new leaf with BatchSimulator
+    and backs up all their results, which costs far less than as many
+    separate playouts.
+
+    A playout is worth half a point for the result and half for the box
+    margin, so that losing boxes costs even in games which are won. Nodes
+    only search the moves the rollouts would choose from: the boxes on
+    offer, or else the moves not giving a box away, or else every move
+    (see Node). Offered boxes are therefore always taken, never declined
+    to keep control.
+
+    The tree is kept between get_action calls: when the new position is
+    reachable from the previous root within a few moves, that subtree
+    becomes the new root.
+
+    With a stats hook set, selection and expansion are timed as successor
+    generation and playouts as evaluation.
+    """
+
+    # how deep below the old root the new position is looked for
+    REUSE_DEPTH = 4
+
+    def __init__(self, iterations: int = 2000, time_limit: Optional[float] = None,
+                 exploration: float = 1.4, seed: Optional[int] = None, rollout_batch: int = 1):
+        self.iterations = iterations
+        self.time_limit = time_limit
+        self.exploration = exploration
+        self.rollout_batch = rollout_batch
+        self.random = random if seed is None else random.Random(seed)
+        self.root = None
+        # set by stop() from another thread
+        self.stop_requested = False
+        self.reused = False
+        self.playouts = 0
+        # deepest tree node reached by the last search
+        self.tree_depth = 0
+        self.profiling = False
+        self.successor_time = 0.0
+        self.evaluation_time = 0.0
+
+    def stop(self):
+        self.stop_requested = True
+
+    def get_action(self, state: GameState) -> GameAction:
+        start = time.perf_counter()
+        self.profiling = self.stats_hook is not None
+        board = Bitboard.from_state(state)
+        self.root = self.find_root(board)
+        self.search(board)
+        best = max(self.root.children.values(), key=lambda child: child.visits)
+        if self.profiling:
+            self.report_stats(MoveStats(
+                type(self).__name__, "search", self.playouts, depth=self.tree_depth,
+                time=time.perf_counter() - start, successor_time=self.successor_time,
+                evaluation_time=self.evaluation_time, free_edges=board.num_free_edges()))
+        return board.action_of(best.edge)
+
+    # reuse the subtree of the previous search when the game went through it
+    def find_root(self, board: Bitboard) -> Node:
+        self.reused = False
+        if self.root is not None and self.root.edges & board.edges == self.root.edges:
+            frontier = [self.root]
+            for _ in range(self.REUSE_DEPTH + 1):
+                next_frontier = []
+                for node in frontier:
+                    if node.matches(board):
+                        node.parent = None
+                        self.reused = True
+                        return node
+                    for edge, child in node.children.items():
+                        if board.edges >> edge & 1:
+                            next_frontier.append(child)
+                frontier = next_frontier
+        return Node(board, player1_moved=not board.player1_turn, rng=self.random)
+
+    def search(self, board: Bitboard):
+        deadline = None if self.time_limit is None else time.perf_counter() + self.time_limit
+        self.playouts = 0
+        self.tree_depth = 0
+        self.successor_time = 0.0
+        self.evaluation_time = 0.0
+        while True:
+            if self.stop_requested and self.playouts > 0:
+                break
+            if deadline is not None:
+                if time.perf_counter() > deadline and self.playouts > 0:
+                    break
+            elif self.playouts >= self.iterations:
+                break
+            self.iterate(board.copy())
+            self.playouts += 1
+
+    def iterate(self, board: Bitboard):
+        if self.profiling:
+            start = time.perf_counter()
+        node = self.root
+        depth = 0
+
+        # selection
+        while not node.untried and node.children:
+            node = self.select(node)
+            board.make_move(node.edge)
+            depth += 1
+
+        # expansion
+        if node.untried:
+            edge = node.untried.pop()
+            player1_moved = board.player1_turn
+            board.make_move(edge)
+            child = Node(board, edge, node, player1_moved, self.random)
+            node.children[edge] = child
+            node = child
+            depth += 1
+        self.tree_depth = max(self.tree_depth, depth)
+
+        # simulation
+        if self.profiling:
+            expanded = time.perf_counter()
+            self.successor_time += expanded - start
+            playouts, player2_reward = self.simulate(board)
+            self.evaluation_time += time.perf_counter() - expanded
+        else:
+            playouts, player2_reward = self.simulate(board)
+
+        # backpropagation
+        player1_reward = playouts - player2_reward
+        while node is not None:
+            node.visits += playouts
+            node.wins += player1_reward if node.player1_moved else player2_reward
+            node = node.parent
+
+    def select(self, node: Node) -> Node:
+        log_visits = math.log(node.visits)
+        exploration = self.exploration
+        best = None
+        best_value = -1.0
+        for child in node.children.values():
+            value = child.wins / child.visits + exploration * math.sqrt(log_visits / child.visits)
+            if value > best_value:
+                best_value = value
+                best = child
+        return best
+
+    # returns the number of playouts from board and the sum of their rewards
+    # for player 2, the rewards of player 1 being one minus those
+    def simulate(self, board: Bitboard):
+        if self.rollout_batch <= 1:
+            return 1, self.reward(board.layout.num_boxes, self.rollout(board))
+        sim = BatchSimulator.from_board(board, self.rollout_batch, self.random.getrandbits(32))
+        scores = sim.run("greedy")
+        return self.rollout_batch, float(self.reward(board.layout.num_boxes, scores).sum())
+
+    # reward of player 2 for a final score (or an array of them), from 0 to 1:
+    # half for the result, draws counting half, half for the box margin
+    def reward(self, num_boxes: int, score):
+        result = 0.5 + 0.5 * ((score > 0) * 1.0 - (score < 0))
+        return 0.5 * result + 0.25 + 0.25 * score / num_boxes
+
+    # finish the game with a cheap greedy policy, returns the final score
+    def rollout(self, board: Bitboard) -> int:
+        rng = self.random
+        free = board.free_edges()
+        rng.shuffle(free)
+        # once no safe move is found, stop looking for one
+        safe_left = True
+        while free:
+            pick = len(free) - 1
+            if board.three_sided:
+                for i in range(len(free) - 1, -1, -1):
+                    if board.completes_box(free[i]):
+                        pick = i
+                        break
+            elif safe_left:
+                for i in range(len(free) - 1, -1, -1):
+                    if not board.creates_three_sided_box(free[i]):
+                        pick = i
+                        break
+                else:
+                    safe_left = False
+            free[pick], free[-1] = free[-1], free[pick]
+            board.make_move(free.pop())
+        return board.score
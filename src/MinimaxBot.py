@@ -1,11 +1,148 @@
-from copy import deepcopy
+from Bitboard import Bitboard
+from BoardLayout import BoardLayout
 from Bot import Bot
+from concurrent.futures import ProcessPoolExecutor
+from EndgameSolver import EndgameSolver
+from Evaluation import WeightedEvaluation
 from GameAction import GameAction
 from GameState import GameState
+from OpeningBook import OpeningBook
+from SearchStats import MoveStats
+from TranspositionTable import EXACT, LOWER_BOUND, UPPER_BOUND, TranspositionTable
+from typing import Optional, Union
+import math
+import multiprocessing
 import random
-import numpy as np
+import time
+
+
+SEARCH_MODES = ("alphabeta", "pvs")
+
+
+class SearchTimeout(Exception):
+    """
+    Raised inside minimax when the time budget of the move has run out.
+    """
+
 
 class MinimaxBot(Bot):
+    """
+    Alpha-beta minimax with iterative deepening. Each move searches depth
+    1, 2, ... until time_limit seconds have passed or max_depth is reached,
+    and plays the best move of the last completed depth. Without max_depth,
+    the depth limit follows the number of free edges so that larger boards
+    stay within roughly NODE_BUDGET nodes even without a time limit.
+
+    With move_ordering, each node tries the transposition table move first,
+    then moves taking a box, killer moves, moves not leaving a three-sided
+    box and the rest, ties broken by the history heuristic. nodes,
+    cutoffs, tt_hits and tt_misses count the work of the last move, and
+    with a stats hook set (see Bot.set_stats_hook) successor generation
+    and evaluation are timed as well.
+
+    With endgame, positions where every free edge gives a box away are
+    played exactly by EndgameSolver instead of searched.
+
+    With symmetry, rotations and reflections of a position share their
+    transposition table entry, and root moves which the symmetries of the
+    position map onto each other are searched once.
+
+    With a book (an OpeningBook or the path of one), book positions are
+    played without searching and tablebase positions met during the search
+    are scored exactly.
+
+    With an evaluation (a WeightedEvaluation or the path of its weights,
+    see SelfPlay.py), positions at the depth limit are scored by fitted
+    features instead of by the boxes taken so far.
+
+    With search_mode="pvs", every move after the first of a node is
+    searched with a null window around alpha (beta for player 1), and only
+    searched again with the full window when it proves better, which pays
+    off when the first move is usually the best. With aspiration, the
+    first root move of every depth is searched within that distance of
+    the value of the previous depth before falling back to the full
+    window. The default search_mode="alphabeta" searches every move with
+    the full window.
+
+    With workers > 1, the root moves are split round-robin between worker
+    processes which each run their own iterative deepening and
+    transposition table, and the deepest depth finished by every worker is
+    played. Workers share the best root value found at every depth, so a
+    worker only proves its moves worse than the best move of any worker.
+    Workers start from an empty table on every move, and moves which may
+    be the best get exact values whatever the others found, so with
+    time_limit=None and a fixed seed the chosen move does not depend on
+    scheduling. Call close() to stop the worker processes. In a daemonic
+    process, such as a worker of Tournament's pool, which may not start
+    processes of its own, the search runs serially.
+
+    stop() may be called from another thread to end a serial search early,
+    playing the best move of the last completed depth. It holds until
+    clear_stop() is called.
+    """
+
+    # how many nodes are searched between two clock reads
+    TIME_CHECK_INTERVAL = 256
+    # nodes a depth may take with well ordered alpha-beta (b ** (d / 2))
+    NODE_BUDGET = 200000
+    # width of the null windows of pvs: scores are whole boxes, but fitted
+    # evaluations are not, so the window is narrower than any difference
+    NULL_WINDOW = 1e-3
+    # depths whose best root value workers share, deeper ones are not shared
+    SHARED_DEPTHS = 64
+
+    def __init__(self, time_limit: float = 0.5, max_depth: Optional[int] = None,
+                 tt_size: int = 1 << 16, move_ordering: bool = True,
+                 endgame: bool = True, workers: int = 1, seed: Optional[int] = None,
+                 book: Union[OpeningBook, str, None] = None, symmetry: bool = True,
+                 evaluation: Union[WeightedEvaluation, str, None] = None,
+                 search_mode: str = "alphabeta", aspiration: Optional[float] = None):
+        if search_mode not in SEARCH_MODES:
+            raise ValueError("search_mode must be one of " + ", ".join(SEARCH_MODES))
+        self.time_limit = time_limit
+        self.max_depth = max_depth
+        # positions searched so far in the current game
+        self.tt = TranspositionTable(tt_size)
+        self.last_layout = None
+        self.last_marked = -1
+        self.deadline = None
+        # set by stop() from another thread, ends the search like the deadline
+        self.stop_requested = False
+        self.move_ordering = move_ordering
+        # two killer moves per game ply and a cut-off score per edge
+        self.killers = {}
+        self.history = []
+        self.nodes = 0
+        self.cutoffs = 0
+        self.tt_hits = 0
+        self.tt_misses = 0
+        self.completed_depth = 0
+        # seconds applying moves in generate_successor and in
+        # get_objective_value, only measured while profiling
+        self.profiling = False
+        self.successor_time = 0.0
+        self.evaluation_time = 0.0
+        # how the last move was chosen: "book", "endgame" or "search"
+        self.source = "search"
+        # root move values of every depth finished in the last search
+        self.depth_results = {}
+        self.endgame = EndgameSolver() if endgame else None
+        self.workers = workers
+        self.pool = None
+        # best root value of every depth: shared_bounds is created with the
+        # pool, root_bounds is set to it in the worker processes
+        self.shared_bounds = None
+        self.root_bounds = None
+        self.book = OpeningBook(book) if isinstance(book, str) else book
+        self.symmetry = symmetry
+        if isinstance(evaluation, str):
+            evaluation = WeightedEvaluation.load(evaluation)
+        self.evaluation = evaluation
+        self.pvs = search_mode == "pvs"
+        self.search_mode = search_mode
+        self.aspiration = aspiration
+        # tie-breaks use the global random module unless seeded
+        self.random = random if seed is None else random.Random(seed)
 
     def getPlayerValue(self, player1):
         if player1:
@@ -13,188 +150,434 @@ class MinimaxBot(Bot):
         else:
             return 1
 
-    # the objective value is the sum of all the squares completed by the agent
-    def get_objective_value(self, state: GameState) -> int:
-        total = 0
-        for i in state.board_status:
-            for j in i:
-                if abs(j) == 4:
-                    total += j//4
-        return total
+    # the objective value is the sum of all the squares completed by the agent,
+    # or the final score the fitted evaluation expects
+    def get_objective_value(self, board: Bitboard) -> float:
+        if self.evaluation is not None:
+            return self.evaluation(board)
+        return board.score
 
     #check if current position is final position
-    def finalPos(self, state: GameState):
-        column = np.all(np.ravel(state.col_status) == 1)
-        row = np.all(np.ravel(state.row_status) == 1)
-        return column and row
-
-    # generate successor for a certain state
-    def generate_successor(self, state: GameState, player1):
-        return {**self.generate_successor_row(state, player1), **self.generate_successor_col(state, player1)}
-
-    # all possible row coordinate that can be filled
-    def generate_successor_row(self, state: GameState, player1):
-        [ny, nx] = state.row_status.shape
-        row_and_value = {}
-        for i in range(ny):
-            for j in range(nx):
-                if state.row_status[i, j] == 0:
-                    new_game_state = deepcopy(state)
-                    new_game_state.row_status[i, j] = 1
-                    # not top edge
-                    if i > 0:
-                        new_game_state.board_status[i - 1, j] = self.getPlayerValue(
-                            player1)*abs(new_game_state.board_status[i - 1, j]) + self.getPlayerValue(player1)
-                    # not bottom edge
-                    if i < ny - 1:
-                        new_game_state.board_status[i, j] = self.getPlayerValue(
-                            player1)*abs(new_game_state.board_status[i, j]) + self.getPlayerValue(player1)
-                    row_and_value["row", (j, i)] = (new_game_state, 0)
-        return row_and_value
-
-    # all possible col coordinate that can be filled
-    def generate_successor_col(self, state: GameState, player1):
-        [ny, nx] = state.col_status.shape
-        col_and_value = {}
-        for i in range(ny):
-            for j in range(nx):
-                if state.col_status[i, j] == 0:
-                    new_game_state = deepcopy(state)
-                    new_game_state.col_status[i, j] = 1
-                    # not left edge
-                    if j > 0:
-                        new_game_state.board_status[i, j - 1] = self.getPlayerValue(
-                            player1)*abs(new_game_state.board_status[i, j - 1]) + self.getPlayerValue(player1)
-                    # not right edge
-                    if j < nx - 1:
-                        new_game_state.board_status[i, j] = self.getPlayerValue(
-                            player1)*abs(new_game_state.board_status[i, j]) + self.getPlayerValue(player1)
-                    col_and_value["col", (j, i)] = (new_game_state, 0)
-        return col_and_value
-
-    #check if get box from line input
-    def checkConsecutiveTurn(self, iState: GameState, fState: GameState):
-        iBoard = np.ravel(iState.board_status)
-        fBoard = np.ravel(fState.board_status)
-        i = 0
-        while i < 9:
-            if abs(iBoard[i]) < abs(fBoard[i]) and abs(fBoard[i]) == 4:
-                return True
-            i += 1
-        return False
-
-    def evaluate_keys(self, list_keys: list, state: GameState, maximize = True):
+    def finalPos(self, board: Bitboard):
+        return board.is_final()
+
+    # play each move on board in place and yield it, with whether the mover
+    # plays again; the move is taken back when the next one is asked for or
+    # the generator is closed, so no child position is ever copied
+    def generate_successor(self, board: Bitboard, moves=None):
+        if moves is None:
+            moves = board.free_edges()
+        profiling = self.profiling
+        for edge in moves:
+            if profiling:
+                start = time.perf_counter()
+            consecutive_turn = board.make_move(edge) > 0
+            if profiling:
+                self.successor_time += time.perf_counter() - start
+            try:
+                yield edge, consecutive_turn
+            finally:
+                board.unmake_move()
+
+    # get_objective_value, timed when profiling
+    def evaluate(self, board: Bitboard):
+        if not self.profiling:
+            return self.get_objective_value(board)
+        start = time.perf_counter()
+        value = self.get_objective_value(board)
+        self.evaluation_time += time.perf_counter() - start
+        return value
+
+    # most promising moves first, so that alpha-beta cuts off early
+    def order_moves(self, board: Bitboard, moves: list, tt_move=-1):
+        if not self.move_ordering:
+            return moves
+        killers = self.killers.get(board.filled, ())
+        history = self.history
+
+        def rank(edge):
+            if edge == tt_move:
+                return (0, 0)
+            if board.completes_box(edge):
+                return (1, 0)
+            if edge in killers:
+                return (2, 0)
+            if not board.creates_three_sided_box(edge):
+                return (3, -history[edge])
+            return (4, -history[edge])
+
+        return sorted(moves, key=rank)
+
+    # remember a quiet move that caused a cut-off
+    def record_cutoff(self, board: Bitboard, edge, depth):
+        self.cutoffs += 1
+        if not self.move_ordering or board.completes_box(edge):
+            return
+        ply = board.filled
+        killers = self.killers.get(ply, [])
+        if edge not in killers:
+            self.killers[ply] = [edge] + killers[:1]
+        self.history[edge] += depth * depth
+
+    # heuristic not to choose action that will give enemy chance to close the square
+    def evaluate_keys(self, list_keys: list, board: Bitboard):
         # list of heuristic applied choices
-        available_choices = []
-        for choice in list_keys:
-            state_copy : GameState
-            state_copy = deepcopy(state)
-
-            movement_type = choice[0]
-            x, y = choice[1]
-            i = y ; j = x
-
-            if movement_type == 'row':
-                ny = state.row_status.shape[0]
-                # not top edge
-                if i > 0:
-                    state_copy.board_status[i - 1, j] = self.getPlayerValue(
-                        state.player1_turn)*abs(state_copy.board_status[i - 1, j]) + self.getPlayerValue(state.player1_turn)
-                # not bottom edge
-                if i < ny - 1:
-                    state_copy.board_status[i, j] = self.getPlayerValue(
-                        state.player1_turn)*abs(state_copy.board_status[i, j]) + self.getPlayerValue(state.player1_turn)
-                    
-            else:
-                nx = state.col_status.shape[1]
-                # not left edge
-                if j > 0:
-                    state_copy.board_status[i, j - 1] = self.getPlayerValue(
-                        state.player1_turn)*abs(state_copy.board_status[i, j - 1]) + self.getPlayerValue(state.player1_turn)
-                # not right edge
-                if j < nx - 1:
-                    state_copy.board_status[i, j] = self.getPlayerValue(
-                        state.player1_turn)*abs(state_copy.board_status[i, j]) + self.getPlayerValue(state.player1_turn)
-
-            chosen = True
-            sy, sx = state_copy.board_status.shape
-            for i in range(sy):
-                for j in range(sx):
-                    if maximize and state_copy.board_status[i,j] == 3:
-                        chosen = False
-                    elif not maximize and state_copy.board_status[i,j] == -3:
-                        chosen = False
-
-            # add to available_choices if chosen
-            if chosen:
-                available_choices.append(choice)
+        available_choices = [
+            edge for edge in list_keys if not board.creates_three_sided_box(edge)]
 
         if len(available_choices) != 0:
             # randomize when available choices are more than one
-            return random.choice(available_choices)
+            return self.random.choice(available_choices)
         else:
             # choose initial list_keys random if available_choices are not available
-            return random.choice(list_keys)
+            return self.random.choice(list_keys)
 
     #minimax algorithm
-    def minimax (self, state: GameState, depth, alpha, beta, player1):
-        if depth == 0 or self.finalPos(state):
-            return self.get_objective_value(state)
-
-        if not player1:
-            path = {}
-            maxValue = -100
-            successor = self.generate_successor(state,player1)
-            for key in successor:
-                if self.checkConsecutiveTurn(state, successor.get(key)[0]):
-                    player1Turn = False
+    def minimax (self, board: Bitboard, depth, alpha, beta):
+        self.nodes += 1
+        if self.deadline is not None and self.nodes % self.TIME_CHECK_INTERVAL == 0:
+            if self.stop_requested or time.perf_counter() > self.deadline:
+                raise SearchTimeout()
+
+        if depth == 0 or self.finalPos(board):
+            return self.evaluate(board)
+
+        if self.book is not None and self.book.is_residual(board):
+            known = self.book.probe(board)
+            if known is not None and known.exact:
+                return board.score + self.getPlayerValue(board.player1_turn) * known.value
+
+        if self.symmetry:
+            tt_key, t = board.canonical()
+        else:
+            tt_key, t = board.hash, 0
+        entry = self.tt.probe(tt_key)
+        tt_move = -1
+        if entry is not None and entry.best_move >= 0:
+            # moves are stored as played on the canonical position
+            tt_move = board.layout.inverse_edge_perms[t][entry.best_move]
+        if entry is not None and entry.depth >= depth:
+            if entry.flag == EXACT:
+                return entry.value
+            elif entry.flag == LOWER_BOUND:
+                alpha = max(alpha, entry.value)
+            else:
+                beta = min(beta, entry.value)
+            if beta <= alpha:
+                return entry.value
+        alpha_orig, beta_orig = alpha, beta
+
+        best_move = -1
+        if not board.player1_turn:
+            bestValue = -100
+            moves = self.order_moves(board, board.free_edges(), tt_move)
+            successor = self.generate_successor(board, moves)
+            for key, _ in successor:
+                if self.pvs and best_move >= 0:
+                    # prove the move is no better than alpha with a null window
+                    value = self.minimax(board, depth-1, alpha, alpha + self.NULL_WINDOW)
+                    if alpha < value < beta:
+                        value = self.minimax(board, depth-1, alpha, beta)
                 else:
-                    player1Turn = True
-                value = self.minimax(successor.get(key)[0], depth-1, alpha, beta, player1Turn)
-                maxValue = max(maxValue, value)
+                    value = self.minimax(board, depth-1, alpha, beta)
+                if value > bestValue:
+                    bestValue = value
+                    best_move = key
                 alpha = max(alpha, value)
-                if depth == 4:  
-                    path[key[0],key[1]] = value
                 if beta <= alpha:
                     break
-            if depth == 4:
-                return path
-            else:
-                return maxValue
+            successor.close()
 
         else:
-            path = {}
-            minValue = 100
-            successor = self.generate_successor(state, player1)
-            for key in successor:
-                if self.checkConsecutiveTurn(state, successor.get(key)[0]):
-                    player1Turn = True
+            bestValue = 100
+            moves = self.order_moves(board, board.free_edges(), tt_move)
+            successor = self.generate_successor(board, moves)
+            for key, _ in successor:
+                if self.pvs and best_move >= 0:
+                    value = self.minimax(board, depth-1, beta - self.NULL_WINDOW, beta)
+                    if alpha < value < beta:
+                        value = self.minimax(board, depth-1, alpha, beta)
                 else:
-                    player1Turn = False
-                value = self.minimax(successor.get(key)[0], depth-1, alpha, beta, player1Turn)
-                minValue = min(minValue, value)
+                    value = self.minimax(board, depth-1, alpha, beta)
+                if value < bestValue:
+                    bestValue = value
+                    best_move = key
                 beta = min(beta, value)
-                if depth == 4:
-                    path[key[0],key[1]] = value
                 if beta <= alpha:
                     break
-            if depth == 4:
-                return path
+            successor.close()
+
+        # the move that cut off is the best one, recorded once it is taken back
+        if beta <= alpha:
+            self.record_cutoff(board, best_move, depth)
+        if bestValue <= alpha_orig:
+            flag = UPPER_BOUND
+        elif bestValue >= beta_orig:
+            flag = LOWER_BOUND
+        else:
+            flag = EXACT
+        if best_move >= 0:
+            best_move = board.layout.edge_perms[t][best_move]
+        self.tt.store(tt_key, depth, bestValue, flag, best_move)
+        return bestValue
+
+    # value of every root move searched to depth, trying moves in the given order;
+    # guess is the value expected from the previous depth, for aspiration
+    def search_root(self, board: Bitboard, depth, moves=None, guess=None):
+        # a timeout leaves moves on the board, so search on a copy
+        board = board.copy()
+        path = {}
+        maximize = not board.player1_turn
+        best = -100 if maximize else 100
+        if moves is None:
+            moves = self.order_moves(board, board.free_edges())
+        for key, _ in self.generate_successor(board, moves):
+            best = self.exchange_bound(depth, best, maximize)
+            # keep the window one below the best value so that moves tying
+            # with it get exact values rather than bounds
+            if maximize:
+                alpha, beta = best - 1, 100
             else:
-                return minValue
+                alpha, beta = -100, best + 1
+            value = None
+            if path and self.pvs:
+                # a null window tells whether the move can reach the best value
+                if maximize:
+                    value = self.minimax(board, depth-1, alpha, alpha + self.NULL_WINDOW)
+                    refuted = value <= alpha
+                else:
+                    value = self.minimax(board, depth-1, beta - self.NULL_WINDOW, beta)
+                    refuted = value >= beta
+                if not refuted:
+                    value = None
+            if value is None:
+                value = self.aspiration_search(board, depth, alpha, beta, guess)
+            best = max(best, value) if maximize else min(best, value)
+            path[key] = value
+        self.exchange_bound(depth, best, maximize)
+        return path
+
+    # publish best as a value of the root at depth, and return the best one
+    # any worker has found; best itself when searching alone
+    def exchange_bound(self, depth, best, maximize):
+        bounds = self.root_bounds
+        if bounds is None or depth >= len(bounds):
+            return best
+        with bounds.get_lock():
+            shared = bounds[depth]
+            if maximize and best > shared or not maximize and best < shared:
+                bounds[depth] = shared = best
+        return shared
+
+    # search within aspiration of guess, and again with the whole window
+    # when the value falls outside it
+    def aspiration_search(self, board: Bitboard, depth, alpha, beta, guess):
+        if guess is not None and self.aspiration is not None:
+            low = max(alpha, guess - self.aspiration)
+            high = min(beta, guess + self.aspiration)
+            if low < high:
+                value = self.minimax(board, depth-1, low, high)
+                if (low < value or low == alpha) and (value < high or high == beta):
+                    return value
+        return self.minimax(board, depth-1, alpha, beta)
+
+    # root moves grouped by the symmetries of the position, keyed by the smallest
+    def root_orbits(self, board: Bitboard, moves: list):
+        orbits = {}
+        if not self.symmetry:
+            for edge in moves:
+                orbits[edge] = [edge]
+            return orbits
+        perms = [board.layout.edge_perms[t] for t in board.symmetries()]
+        for edge in moves:
+            orbits.setdefault(min(perm[edge] for perm in perms), []).append(edge)
+        return orbits
+
+    # the value of every root move from the values of the orbit representatives
+    def expand_orbits(self, orbits, successors):
+        return {edge: value for key, value in successors.items() for edge in orbits[key]}
+
+    # forget the previous game when the board is smaller than the last one seen
+    def prepare_table(self, board: Bitboard):
+        marked = board.filled
+        if board.layout is not self.last_layout or marked < self.last_marked:
+            self.tt.clear()
+            self.killers = {}
+            self.history = [0] * board.layout.num_edges
+        else:
+            self.history = [h // 2 for h in self.history]
+        self.last_layout = board.layout
+        self.last_marked = marked
+        self.tt.new_search()
+
+    # iterative deepening until the time budget or the depth limit is reached
+    def iterative_deepening(self, board: Bitboard, moves=None):
+        max_depth = self.depth_limit(board)
+        if moves is None:
+            orbits = self.root_orbits(board, board.free_edges())
+            moves = self.order_moves(board, list(orbits))
+        else:
+            orbits = {edge: [edge] for edge in moves}
+
+        start = time.perf_counter()
+        self.reset_counters()
+        hits, misses = self.tt.hits, self.tt.misses
+        # the first depth always completes so there is a move to play
+        self.deadline = None
+        successors = self.search_root(board, 1, moves)
+        self.completed_depth = 1
+        self.depth_results[1] = self.expand_orbits(orbits, successors)
+        self.deadline = math.inf if self.time_limit is None else start + self.time_limit
+
+        for depth in range(2, max_depth + 1):
+            if self.stop_requested:
+                break
+            # best moves of the previous depth first
+            moves = list(successors)
+            if self.move_ordering:
+                moves.sort(key=successors.get, reverse=not board.player1_turn)
+            guess = min(successors.values()) if board.player1_turn else max(successors.values())
+            try:
+                successors = self.search_root(board, depth, moves, guess)
+            except SearchTimeout:
+                break
+            self.completed_depth = depth
+            self.depth_results[depth] = self.expand_orbits(orbits, successors)
+        self.deadline = None
+        self.tt_hits = self.tt.hits - hits
+        self.tt_misses = self.tt.misses - misses
+        return self.depth_results[self.completed_depth]
+
+    def reset_counters(self):
+        self.nodes = 0
+        self.cutoffs = 0
+        self.tt_hits = 0
+        self.tt_misses = 0
+        self.successor_time = 0.0
+        self.evaluation_time = 0.0
+        self.completed_depth = 0
+        self.depth_results = {}
+
+    # work of the last move, summed over the workers in parallel_deepening
+    def counters(self):
+        return dict(nodes=self.nodes, cutoffs=self.cutoffs, tt_hits=self.tt_hits,
+                    tt_misses=self.tt_misses, successor_time=self.successor_time,
+                    evaluation_time=self.evaluation_time)
+
+    # iterative deepening with the root moves split between worker processes
+    def parallel_deepening(self, board: Bitboard):
+        if self.pool is None:
+            self.shared_bounds = multiprocessing.Array("d", self.SHARED_DEPTHS)
+            self.pool = ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                                            initargs=(self.shared_bounds,))
+        # no root value found yet at any depth
+        self.shared_bounds[:] = [100 if board.player1_turn else -100] * self.SHARED_DEPTHS
+
+        orbits = self.root_orbits(board, board.free_edges())
+        moves = self.order_moves(board, list(orbits))
+        chunks = [moves[i::self.workers] for i in range(self.workers)]
+        settings = dict(time_limit=self.time_limit, max_depth=self.depth_limit(board),
+                        tt_size=self.tt.size, move_ordering=self.move_ordering,
+                        book=self.book, symmetry=self.symmetry, evaluation=self.evaluation,
+                        search_mode=self.search_mode, aspiration=self.aspiration)
+        position = (board.layout.rows, board.layout.cols, board.edges,
+                    board.p1_boxes, board.p2_boxes, board.player1_turn)
+        futures = [self.pool.submit(_search_root_moves, position, chunk, settings, self.profiling)
+                   for chunk in chunks if chunk]
 
-    def get_neighbor(self, state: GameState):
-        successors = self.minimax(state, 4, -100, 100, state.player1_turn)
-        if state.player1_turn:
+        results = [future.result() for future in futures]
+        self.reset_counters()
+        for _, counters in results:
+            for name, value in counters.items():
+                setattr(self, name, getattr(self, name) + value)
+        depth = min(max(depth_results) for depth_results, _ in results)
+        self.completed_depth = depth
+        successors = {}
+        for depth_results, _ in results:
+            successors.update(depth_results[depth])
+        # back in root move order so that seeded tie-breaks are repeatable
+        return self.expand_orbits(orbits, {move: successors[move] for move in moves})
+
+    def depth_limit(self, board: Bitboard):
+        free = board.num_free_edges()
+        if self.max_depth is None:
+            return self.depth_for(free)
+        return min(self.max_depth, free)
+
+    # deepest search the node budget allows with free edges to choose from
+    def depth_for(self, free):
+        if free <= 2:
+            return max(free, 1)
+        return min(free, max(2, int(2 * math.log(self.NODE_BUDGET) / math.log(free))))
+
+    def get_neighbor(self, board: Bitboard):
+        if self.book is not None:
+            known = self.book.probe(board)
+            if known is not None and board.is_free(known.edge):
+                self.reset_counters()
+                self.source = "book"
+                return known.edge
+
+        if self.endgame is not None:
+            solution = self.endgame.solve(board)
+            if solution is not None:
+                self.reset_counters()
+                self.source = "endgame"
+                return solution.edge
+
+        self.source = "search"
+
+        if self.workers > 1 and not multiprocessing.current_process().daemon:
+            successors = self.parallel_deepening(board)
+        else:
+            successors = self.iterative_deepening(board)
+        if board.player1_turn:
             value = min(successors.values())
-            min_keys = [k for k, v in successors.items() if v == value]
-            act = self.evaluate_keys(min_keys, state, maximize=False)
         else:
             value = max(successors.values())
-            max_keys = [k for k, v in successors.items() if v == value]
-            act = self.evaluate_keys(max_keys, state, maximize=True)
-        return act
+        best_keys = [k for k, v in successors.items() if v == value]
+        return self.evaluate_keys(best_keys, board)
+
+    def stop(self):
+        self.stop_requested = True
 
     def get_action(self, state: GameState) -> GameAction:
-        lit, pos = self.get_neighbor(state)
-        return GameAction(lit, pos)
\ No newline at end of file
+        start = time.perf_counter()
+        self.profiling = self.stats_hook is not None
+        board = Bitboard.from_state(state)
+        self.prepare_table(board)
+        edge = self.get_neighbor(board)
+        if self.profiling:
+            self.report_stats(MoveStats(
+                type(self).__name__, self.source, self.nodes, self.cutoffs, self.tt_hits,
+                self.tt_misses, self.completed_depth, time.perf_counter() - start,
+                self.successor_time, self.evaluation_time, board.num_free_edges()))
+        return board.action_of(edge)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+            self.shared_bounds = None
+
+
+# the shared_bounds of the MinimaxBot owning the pool, set in every worker
+_root_bounds = None
+
+
+# runs in every worker process of MinimaxBot.parallel_deepening as it starts
+def _init_worker(root_bounds):
+    global _root_bounds
+    _root_bounds = root_bounds
+
+
+# runs in a worker process of MinimaxBot.parallel_deepening
+def _search_root_moves(position, moves, settings, profiling=False):
+    rows, cols, edges, p1_boxes, p2_boxes, player1_turn = position
+    board = Bitboard(BoardLayout.get(rows, cols), edges, p1_boxes, p2_boxes, player1_turn)
+    bot = MinimaxBot(endgame=False, **settings)
+    bot.root_bounds = _root_bounds
+    bot.profiling = profiling
+    bot.prepare_table(board)
+    bot.iterative_deepening(board, bot.order_moves(board, moves))
+    return bot.depth_results, bot.counters()
@@ -0,0 +1,138 @@
+from BoardLayout import BoardLayout
+from GameAction import GameAction
+from GameState import GameState
+import random
+import numpy as np
+
+
+class MoveIndex:
+    """
+    The free edges of a board in BoardLayout numbering, with the number of
+    marked sides of every box, kept up to date as edges are marked.
+
+    moves holds the free edges in no particular order and position[e] the
+    index of edge e in it (-1 once marked), so marking an edge swaps it
+    with the last free edge and pops it: removal, membership and uniform
+    sampling are O(1). add reverts remove, in reverse order.
+    """
+
+    def __init__(self, layout: BoardLayout, edges: int = 0):
+        self.layout = layout
+        self.moves = [e for e in range(layout.num_edges) if not edges >> e & 1]
+        self.position = [-1] * layout.num_edges
+        for i, e in enumerate(self.moves):
+            self.position[e] = i
+        self.sides = [(edges & mask).bit_count() for mask in layout.box_masks]
+
+    @classmethod
+    def from_state(cls, state: GameState) -> "MoveIndex":
+        """
+        Built with array operations: row_status and col_status flattened
+        row by row are the edges in BoardLayout order, and the absolute
+        board_status of a box is its number of marked sides.
+        """
+        rows, cols = state.board_status.shape
+        marked = np.concatenate([state.row_status.ravel(), state.col_status.ravel()])
+        moves = np.flatnonzero(marked == 0)
+        position = np.full(len(marked), -1)
+        position[moves] = np.arange(len(moves))
+
+        index = MoveIndex.__new__(MoveIndex)
+        index.layout = BoardLayout.get(rows, cols)
+        index.moves = moves.tolist()
+        index.position = position.tolist()
+        index.sides = np.abs(state.board_status).ravel().tolist()
+        return index
+
+    def copy(self) -> "MoveIndex":
+        index = MoveIndex.__new__(MoveIndex)
+        index.layout = self.layout
+        index.moves = self.moves.copy()
+        index.position = self.position.copy()
+        index.sides = self.sides.copy()
+        return index
+
+    def __len__(self) -> int:
+        return len(self.moves)
+
+    def __contains__(self, edge: int) -> bool:
+        return self.position[edge] >= 0
+
+    def __iter__(self):
+        return iter(self.moves)
+
+    def remove(self, edge: int) -> int:
+        """
+        Marks edge and returns the number of boxes it completes.
+        """
+        moves = self.moves
+        position = self.position
+        i = position[edge]
+        last = moves.pop()
+        if last != edge:
+            moves[i] = last
+            position[last] = i
+        position[edge] = -1
+
+        completed = 0
+        sides = self.sides
+        for b in self.layout.edge_boxes[edge]:
+            sides[b] += 1
+            if sides[b] == 4:
+                completed += 1
+        return completed
+
+    def add(self, edge: int):
+        self.position[edge] = len(self.moves)
+        self.moves.append(edge)
+        sides = self.sides
+        for b in self.layout.edge_boxes[edge]:
+            sides[b] -= 1
+
+    def sample(self, rng=random) -> int:
+        return self.moves[rng.randrange(len(self.moves))]
+
+    def boxes_completed(self, edge: int) -> int:
+        """
+        Number of boxes (0, 1 or 2) marking edge would complete.
+        """
+        sides = self.sides
+        completed = 0
+        for b in self.layout.edge_boxes[edge]:
+            if sides[b] == 3:
+                completed += 1
+        return completed
+
+    def completes_box(self, edge: int) -> bool:
+        sides = self.sides
+        for b in self.layout.edge_boxes[edge]:
+            if sides[b] == 3:
+                return True
+        return False
+
+    def creates_three_sided_box(self, edge: int) -> bool:
+        sides = self.sides
+        for b in self.layout.edge_boxes[edge]:
+            if sides[b] == 2:
+                return True
+        return False
+
+    def edge_effects(self):
+        """
+        For every free edge, in the order of moves, as arrays: the number of
+        boxes marking it would complete and whether it would leave a box
+        with three sides. Looked up in the side counts all at once.
+        """
+        # outside the board counts as a box with no sides
+        sides = np.array(self.sides + [0], dtype=np.int8)
+        around = sides[self.layout.edge_box_pairs[self.moves]]
+        return (around == 3).sum(axis=1), (around == 2).any(axis=1)
+
+    def safe_moves(self) -> list:
+        """
+        Free edges which do not leave a box with three sides.
+        """
+        return [e for e in self.moves if not self.creates_three_sided_box(e)]
+
+    def action(self, edge: int) -> GameAction:
+        return self.layout.action_of(edge)
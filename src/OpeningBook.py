@@ -0,0 +1,214 @@
+"""
+Precomputed moves on disk: an opening book for the first moves of a game
+and an endgame tablebase of exact values for positions with few free
+edges. Build one with, for example:
+
+    python OpeningBook.py --dots 4 --plies 2 --depth 4 --residual 6 --out book_4.bin
+
+and pass it to MinimaxBot(book="book_4.bin").
+"""
+
+from argparse import ArgumentParser
+from itertools import combinations
+from typing import Dict, NamedTuple, Optional, Tuple
+from Bitboard import Bitboard
+from BoardLayout import BoardLayout
+import struct
+import time
+import numpy as np
+
+MAGIC = b"DBBK"
+VERSION = 2
+# magic, version, rows, cols, residual, record count
+HEADER = struct.Struct("<4sBBBBQ")
+# records are stored column by column so that the keys are one contiguous array
+COLUMNS = [("key", np.dtype("<u8")), ("edge", np.dtype("<u2")),
+           ("value", np.dtype("i1")), ("flags", np.dtype("u1"))]
+
+# the value is exact rather than a depth-limited search result
+EXACT_FLAG = 1
+
+
+class BookEntry(NamedTuple):
+    """
+    edge: the move to play
+    value: boxes the player to move gains over the opponent from here on
+    exact: True for tablebase entries, False for opening book entries
+    """
+
+    edge: int
+    value: int
+    exact: bool
+
+
+class OpeningBook:
+    """
+    Read-only lookup into a book file. Records are sorted by the canonical
+    edge hash of the position (Bitboard.canonical_edge), so rotations and
+    reflections share one record whose move is stored as played on the
+    canonical position. Every column is memory-mapped, so opening a book
+    is instant and a probe is one binary search.
+
+    residual is the number of free edges up to which every position is in
+    the tablebase.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            magic, version, rows, cols, residual, count = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Not an opening book: " + path)
+        self.rows = rows
+        self.cols = cols
+        self.residual = residual
+        self.columns = {}
+        offset = HEADER.size
+        for name, dtype in COLUMNS:
+            if count:
+                self.columns[name] = np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=(count,))
+            else:
+                self.columns[name] = np.zeros(0, dtype=dtype)
+            offset += count * dtype.itemsize
+        self.keys = self.columns["key"]
+
+    def __len__(self):
+        return len(self.keys)
+
+    # reopen from the file in other processes instead of pickling the map
+    def __reduce__(self):
+        return (OpeningBook, (self.path,))
+
+    def probe(self, board: Bitboard) -> Optional[BookEntry]:
+        if board.layout.rows != self.rows or board.layout.cols != self.cols:
+            return None
+        key, t = board.canonical_edge()
+        key = np.uint64(key)
+        i = int(np.searchsorted(self.keys, key))
+        if i == len(self.keys) or self.keys[i] != key:
+            return None
+        columns = self.columns
+        edge = board.layout.inverse_edge_perms[t][int(columns["edge"][i])]
+        return BookEntry(edge, int(columns["value"][i]), bool(columns["flags"][i] & EXACT_FLAG))
+
+    def is_residual(self, board: Bitboard) -> bool:
+        return (board.num_free_edges() <= self.residual and board.layout.rows == self.rows
+                and board.layout.cols == self.cols)
+
+
+def exact_value(board: Bitboard, memo: Dict[int, Tuple[int, int]]) -> Tuple[int, int]:
+    """
+    Returns (value, best edge) for the player to move by searching to the
+    end of the game. memo maps edges to results and is shared between calls.
+    """
+    result = memo.get(board.edges)
+    if result is not None:
+        return result
+    if board.is_final():
+        return 0, -1
+
+    best_value = None
+    best_edge = -1
+    for edge in board.free_edges():
+        taken = board.make_move(edge)
+        value, _ = exact_value(board, memo)
+        board.unmake_move()
+        value = taken + value if taken else -value
+        if best_value is None or value > best_value:
+            best_value = value
+            best_edge = edge
+
+    memo[board.edges] = (best_value, best_edge)
+    return best_value, best_edge
+
+
+def add_entry(entries: Dict[int, tuple], board: Bitboard, edge: int, value: int, flags: int):
+    key, t = board.canonical_edge()
+    entries[key] = (board.layout.edge_perms[t][edge], value, flags)
+
+
+def generate_tablebase(layout: BoardLayout, residual: int) -> Dict[int, tuple]:
+    """
+    Every position with 1 to residual free edges, solved exactly. Only one
+    of each set of symmetric positions is solved.
+    """
+    entries = {}
+    memo = {}
+    for free in range(1, residual + 1):
+        for edges_left in combinations(range(layout.num_edges), free):
+            edges = layout.full_edges
+            for e in edges_left:
+                edges &= ~(1 << e)
+            board = Bitboard(layout, edges)
+            if board.canonical_edge()[0] in entries:
+                continue
+            value, edge = exact_value(board, memo)
+            add_entry(entries, board, edge, value, EXACT_FLAG)
+    return entries
+
+
+def generate_openings(layout: BoardLayout, plies: int, depth: int) -> Dict[int, tuple]:
+    """
+    Every position reachable in up to plies moves, up to symmetry,
+    searched to depth by MinimaxBot.
+    """
+    from MinimaxBot import MinimaxBot
+
+    entries = {}
+    frontier = {0: Bitboard(layout)}
+    for ply in range(plies + 1):
+        next_frontier = {}
+        for board in frontier.values():
+            if board.is_final():
+                continue
+            bot = MinimaxBot(time_limit=None, max_depth=depth, endgame=False)
+            bot.prepare_table(board)
+            successors = bot.iterative_deepening(board)
+            maximize = not board.player1_turn
+            best = max(successors, key=lambda e: successors[e] if maximize else -successors[e])
+            # searched values count every box, the book only the boxes to come
+            value = (successors[best] - board.score) * (1 if maximize else -1)
+            add_entry(entries, board, best, value, 0)
+
+            if ply < plies:
+                for edge in board.free_edges():
+                    child = board.copy()
+                    child.make_move(edge)
+                    next_frontier.setdefault(child.canonical_edge()[0], child)
+        frontier = next_frontier
+    return entries
+
+
+def write_book(path: str, layout: BoardLayout, residual: int, entries: Dict[int, tuple]):
+    keys = sorted(entries)
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, layout.rows, layout.cols, residual, len(keys)))
+        for i, (name, dtype) in enumerate(COLUMNS):
+            if i == 0:
+                column = keys
+            else:
+                column = [entries[key][i - 1] for key in keys]
+            f.write(np.array(column, dtype=dtype).tobytes())
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Build an opening book and endgame tablebase.")
+    parser.add_argument("--dots", type=int, default=4, help="number of dots on each side")
+    parser.add_argument("--plies", type=int, default=2, help="opening moves to cover")
+    parser.add_argument("--depth", type=int, default=4, help="search depth for opening moves")
+    parser.add_argument("--residual", type=int, default=6, help="free edges solved exactly")
+    parser.add_argument("--out", required=True)
+    args = parser.parse_args()
+
+    layout = BoardLayout.get(args.dots - 1, args.dots - 1)
+    start = time.perf_counter()
+    entries = generate_tablebase(layout, args.residual)
+    print("tablebase: {} positions in {:.1f} s".format(len(entries), time.perf_counter() - start))
+
+    start = time.perf_counter()
+    openings = generate_openings(layout, args.plies, args.depth)
+    print("openings: {} positions in {:.1f} s".format(len(openings), time.perf_counter() - start))
+
+    entries.update(openings)
+    write_book(args.out, layout, args.residual, entries)
+    print("wrote {} positions to {}".format(len(entries), args.out))
@@ -0,0 +1,83 @@
+"""
+Compares serial and parallel root search of MinimaxBot at a fixed depth on
+seeded random midgame positions. Example:
+
+    python ParallelBenchmark.py --dots 5 --depth 5 --workers 4
+"""
+
+from argparse import ArgumentParser
+from Bitboard import Bitboard
+from BoardLayout import BoardLayout
+from MinimaxBot import MinimaxBot
+import random
+import time
+
+
+def midgame_positions(number_of_dots: int, count: int, seed: int) -> list:
+    """
+    Positions reached by playing random moves which do not leave a
+    three-sided box, stopping halfway through the safe moves.
+    """
+    rng = random.Random(seed)
+    layout = BoardLayout.get(number_of_dots - 1, number_of_dots - 1)
+    positions = []
+    for _ in range(count):
+        board = Bitboard(layout)
+        for _ in range(layout.num_edges // 3):
+            safe = [e for e in board.free_edges() if not board.creates_three_sided_box(e)]
+            if not safe:
+                break
+            board.make_move(rng.choice(safe))
+        positions.append(board.to_state())
+    return positions
+
+
+def run(bot: MinimaxBot, positions: list):
+    """
+    Times every position from an empty transposition table, as the
+    parallel workers always start, and sums the nodes searched.
+    """
+    elapsed = 0.0
+    nodes = 0
+    actions = []
+    for state in positions:
+        bot.tt.clear()
+        start = time.perf_counter()
+        actions.append(bot.get_action(state))
+        elapsed += time.perf_counter() - start
+        nodes += bot.nodes
+    return elapsed, nodes, actions
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Serial versus parallel MinimaxBot root search.")
+    parser.add_argument("--dots", type=int, default=5)
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--positions", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    # one more position to warm the bots up on, outside the timed ones
+    *positions, warm_up = midgame_positions(args.dots, args.positions + 1, args.seed)
+
+    def make_bot(workers):
+        bot = MinimaxBot(time_limit=None, max_depth=args.depth, endgame=False,
+                         seed=args.seed, workers=workers)
+        # start the worker processes before timing
+        bot.get_action(warm_up)
+        return bot
+
+    serial_time, serial_nodes, serial_actions = run(make_bot(1), positions)
+    parallel = make_bot(args.workers)
+    parallel_time, parallel_nodes, parallel_actions = run(parallel, positions)
+    parallel.close()
+    repeat = make_bot(args.workers)
+    _, _, repeat_actions = run(repeat, positions)
+    repeat.close()
+
+    print("positions: {}, depth: {}, workers: {}".format(len(positions), args.depth, args.workers))
+    print("serial:   {:.2f} s, {} nodes".format(serial_time, serial_nodes))
+    print("parallel: {:.2f} s ({:.2f}x), {} nodes ({:.2f}x)".format(
+        parallel_time, serial_time / parallel_time, parallel_nodes, parallel_nodes / serial_nodes))
+    print("parallel moves repeatable: {}".format(parallel_actions == repeat_actions))
@@ -1,45 +1,21 @@
 from Bot import Bot
 from GameAction import GameAction
 from GameState import GameState
-import random
-import numpy as np
+from MoveIndex import MoveIndex
+from SearchStats import MoveStats
+import time
 
 class RandomBot(Bot):
     def get_action(self, state: GameState) -> GameAction:
-        all_row_marked = np.all(state.row_status == 1)
-        all_col_marked = np.all(state.col_status == 1)
+        if self.stats_hook is None:
+            return self.choose_action(state)
+        start = time.perf_counter()
+        action = self.choose_action(state)
+        self.report_stats(MoveStats(type(self).__name__, "random",
+                                    time=time.perf_counter() - start))
+        return action
 
-        if not (all_row_marked or all_col_marked):
-            return self.get_random_action(state)
-        elif all_row_marked:
-            return self.get_random_col_action(state)
-        else:
-            return self.get_random_row_action(state)
-
-    def get_random_action(self, state: GameState) -> GameAction:
-        if random.random() < 0.5:
-            return self.get_random_row_action(state)
-        else:
-            return self.get_random_col_action(state)
-
-    def get_random_row_action(self, state: GameState) -> GameAction:
-        position = self.get_random_position_with_zero_value(state.row_status)
-        return GameAction("row", position)
-
-    def get_random_position_with_zero_value(self, matrix: np.ndarray):
-        [ny, nx] = matrix.shape
-
-        x = -1
-        y = -1
-        valid = False
-        
-        while not valid:
-            x = random.randrange(0, nx)
-            y = random.randrange(0, ny)
-            valid = matrix[y, x] == 0
-        
-        return (x, y)
-
-    def get_random_col_action(self, state: GameState) -> GameAction:
-        position = self.get_random_position_with_zero_value(state.col_status)
-        return GameAction("col", position)
+    # uniform over the free edges, without retrying marked ones
+    def choose_action(self, state: GameState) -> GameAction:
+        index = MoveIndex.from_state(state)
+        return index.action(index.sample())
@@ -0,0 +1,105 @@
+"""
+Per-move search statistics of bots, and an exporter writing them as JSON
+lines, one line per game.
+
+Set a hook on a bot with bot.set_stats_hook(hook): after every get_action
+the bot calls hook(stats) with a MoveStats. Bots without a hook do no
+extra timing. For example:
+
+    exporter = StatsExporter("stats.jsonl")
+    bot.set_stats_hook(exporter)
+    ...  # play a game
+    exporter.end_game(opponent="RandomBot")
+"""
+
+from typing import List, NamedTuple, Optional
+import json
+import time
+
+
+class MoveStats(NamedTuple):
+    """
+    bot: class name of the bot
+    source: where the move came from, "search", "book", "endgame" or "random"
+    nodes: positions visited
+    cutoffs: alpha-beta cut-offs
+    cache_hits, cache_misses: transposition table probes
+    depth: deepest search depth completed (tree depth for MCTSBot)
+    time: seconds spent in get_action
+    successor_time: seconds spent generating successor positions
+    evaluation_time: seconds spent evaluating positions
+    free_edges: free edges when the move was chosen
+    """
+
+    bot: str
+    source: str
+    nodes: int = 0
+    cutoffs: int = 0
+    cache_hits: int = 0
+    cache_misses: int = 0
+    depth: int = 0
+    time: float = 0.0
+    successor_time: float = 0.0
+    evaluation_time: float = 0.0
+    free_edges: int = 0
+
+
+class StatsExporter:
+    """
+    A stats hook which collects the MoveStats of the current game and
+    appends them to path as one JSON object per game on end_game.
+    Several bots may share one exporter, every move is tagged with the
+    bot's class name.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.moves: List[MoveStats] = []
+        self.games = 0
+
+    def __call__(self, stats: MoveStats):
+        self.moves.append(stats)
+
+    def end_game(self, **info) -> Optional[dict]:
+        """
+        Writes the game with the given extra fields and starts a new one.
+        Returns the written record, or None if no move was recorded.
+        """
+        if not self.moves:
+            return None
+        record = game_record(self.moves, **info)
+        with open(self.path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+        self.moves = []
+        self.games += 1
+        return record
+
+
+def game_record(stats: List[MoveStats], **info) -> dict:
+    """
+    The JSON line of one game: the fields of info, per-bot "totals" and
+    the MoveStats of every move as "stats".
+    """
+    totals = {}
+    for move in stats:
+        total = totals.setdefault(move.bot, {"moves": 0, "nodes": 0, "cutoffs": 0,
+                                              "cache_hits": 0, "cache_misses": 0,
+                                              "max_depth": 0, "time": 0.0, "max_time": 0.0})
+        total["moves"] += 1
+        total["nodes"] += move.nodes
+        total["cutoffs"] += move.cutoffs
+        total["cache_hits"] += move.cache_hits
+        total["cache_misses"] += move.cache_misses
+        total["max_depth"] = max(total["max_depth"], move.depth)
+        total["time"] += move.time
+        total["max_time"] = max(total["max_time"], move.time)
+    record = dict(info)
+    record["timestamp"] = time.time()
+    record["totals"] = totals
+    record["stats"] = [move._asdict() for move in stats]
+    return record
+
+
+def read_stats(path: str) -> List[dict]:
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
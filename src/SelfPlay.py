@@ -0,0 +1,137 @@
+"""
+Self-play games for fitting the weighted evaluation of Evaluation.py.
+
+generate plays seeded games between bots on a process pool and streams
+them to GameRecord shards as they finish, so a long run can be stopped
+at any time and keeps every finished game. fit replays the shards, also
+in parallel, and fits the feature weights by least squares:
+
+    python SelfPlay.py generate MinimaxBot:time_limit=0.05 MCTSBot --games 2000 --out ../selfplay
+    python SelfPlay.py fit ../selfplay --out ../weights.json
+    python Tournament.py MinimaxBot:max_depth=3,time_limit=None "MinimaxBot:max_depth=3,time_limit=None,evaluation='../weights.json'"
+
+Every game starts with a few random moves which do not give a box away,
+so that games between the same bots differ.
+"""
+
+from argparse import ArgumentParser
+from multiprocessing import Pool
+from typing import List, Optional, Tuple
+from Evaluation import FEATURES, features, fit
+from GameRecord import read_records
+from Tournament import play_game
+import glob
+import itertools
+import json
+import os
+import numpy as np
+
+SHARD_NAME = "games-{:05d}.bin"
+
+
+def schedule(bots: List[str], games: int, number_of_dots: int, seed: int, opening: int) -> list:
+    """
+    games games cycling through every ordered pair of bots, a bot against
+    itself included.
+    """
+    pairs = list(itertools.product(bots, repeat=2))
+    return [(*pairs[game % len(pairs)], number_of_dots, seed + game, opening)
+            for game in range(games)]
+
+
+# runs in the pool, returns the encoded GameRecord of one game
+def _play_game(job) -> bytes:
+    player1, player2, number_of_dots, seed, opening = job
+    records = []
+    play_game(player1, player2, number_of_dots, seed, records=records, opening=opening)
+    return records[0].to_bytes()
+
+
+def generate(bots: List[str], games: int, out_dir: str, number_of_dots: int = 4,
+             seed: int = 0, opening: int = 4, workers: Optional[int] = None,
+             shard_size: int = 500) -> List[str]:
+    """
+    Plays the games and appends each one to the current shard of out_dir
+    as soon as it finishes, starting a new shard every shard_size games.
+    Shards already in out_dir are kept. Returns the paths written to.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    first = len(shard_paths(out_dir))
+    jobs = schedule(bots, games, number_of_dots, seed, opening)
+    paths = []
+    shard = None
+    with Pool(workers) as pool:
+        try:
+            for i, data in enumerate(pool.imap_unordered(_play_game, jobs)):
+                if i % shard_size == 0:
+                    if shard is not None:
+                        shard.close()
+                    paths.append(os.path.join(out_dir, SHARD_NAME.format(first + len(paths))))
+                    shard = open(paths[-1], "ab")
+                shard.write(data)
+                shard.flush()
+        finally:
+            if shard is not None:
+                shard.close()
+    return paths
+
+
+def shard_paths(path: str) -> List[str]:
+    if os.path.isdir(path):
+        return sorted(glob.glob(os.path.join(path, "*.bin")))
+    return [path]
+
+
+def shard_samples(path: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Features of every position before the end of every game of a shard,
+    with the final score of the game.
+    """
+    X = []
+    y = []
+    for record in read_records(path):
+        rows = [features(board) for board in itertools.islice(record.boards(), len(record.moves))]
+        p1, p2 = record.scores()
+        X.extend(rows)
+        y.extend([p2 - p1] * len(rows))
+    return np.array(X, dtype=float).reshape(-1, len(FEATURES)), np.array(y, dtype=float)
+
+
+def training_data(paths: List[str], workers: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+    with Pool(workers) as pool:
+        samples = pool.map(shard_samples, paths)
+    return np.concatenate([X for X, _ in samples]), np.concatenate([y for _, y in samples])
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Self-play games and evaluation fitting.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    play = commands.add_parser("generate", help="play games and stream them to shards")
+    play.add_argument("bots", nargs="+", help="bot specs, as in Tournament.py")
+    play.add_argument("--games", type=int, default=1000)
+    play.add_argument("--dots", type=int, default=4)
+    play.add_argument("--seed", type=int, default=0)
+    play.add_argument("--opening", type=int, default=4, help="random moves at the start of every game")
+    play.add_argument("--workers", type=int, default=None, help="processes, default one per CPU")
+    play.add_argument("--shard-size", type=int, default=500, help="games per shard")
+    play.add_argument("--out", default="selfplay", help="directory of the shards")
+
+    fitting = commands.add_parser("fit", help="fit evaluation weights on the shards")
+    fitting.add_argument("shards", nargs="+", help="shard files or directories of shards")
+    fitting.add_argument("--ridge", type=float, default=1e-3)
+    fitting.add_argument("--workers", type=int, default=None)
+    fitting.add_argument("--out", default="weights.json")
+    args = parser.parse_args()
+
+    if args.command == "generate":
+        paths = generate(args.bots, args.games, args.out, args.dots, args.seed,
+                         args.opening, args.workers, args.shard_size)
+        print("wrote {} games to {}".format(args.games, ", ".join(paths)))
+    else:
+        paths = [p for shard in args.shards for p in shard_paths(shard)]
+        X, y = training_data(paths, args.workers)
+        evaluation = fit(X, y, args.ridge)
+        evaluation.info["shards"] = len(paths)
+        evaluation.save(args.out)
+        print(json.dumps({"weights": evaluation.weights, "info": evaluation.info}, indent=1))
@@ -0,0 +1,66 @@
+"""
+Rotations and reflections of the board.
+
+A transform is a (transpose, flip_x, flip_y) triple applied to the dots of
+the board: the flips first, then the transpose. Square boards have all 8
+transforms, other boards the 4 without transpose. Transform 0 is always the
+identity.
+"""
+
+TRANSFORMS = [
+    (False, False, False), (False, True, False), (False, False, True), (False, True, True),
+    (True, False, False), (True, True, False), (True, False, True), (True, True, True),
+]
+
+
+def transforms_for(rows: int, cols: int) -> list:
+    return TRANSFORMS if rows == cols else TRANSFORMS[:4]
+
+
+def transform_dot(transform, x: int, y: int, rows: int, cols: int):
+    transpose, flip_x, flip_y = transform
+    if flip_x:
+        x = cols - x
+    if flip_y:
+        y = rows - y
+    if transpose:
+        x, y = y, x
+    return x, y
+
+
+def edge_permutation(layout, transform) -> list:
+    """
+    perm[e] is the edge which e is moved to.
+    """
+    perm = []
+    for e in range(layout.num_edges):
+        action_type, (x, y) = layout.action_of(e)
+        end = (x + 1, y) if action_type == "row" else (x, y + 1)
+        ax, ay = transform_dot(transform, x, y, layout.rows, layout.cols)
+        bx, by = transform_dot(transform, end[0], end[1], layout.rows, layout.cols)
+        if ay == by:
+            perm.append(layout.edge_of("row", (min(ax, bx), ay)))
+        else:
+            perm.append(layout.edge_of("col", (ax, min(ay, by))))
+    return perm
+
+
+def box_permutation(layout, transform) -> list:
+    """
+    perm[b] is the box which b is moved to.
+    """
+    perm = []
+    for b in range(layout.num_boxes):
+        y, x = divmod(b, layout.cols)
+        ax, ay = transform_dot(transform, x, y, layout.rows, layout.cols)
+        bx, by = transform_dot(transform, x + 1, y + 1, layout.rows, layout.cols)
+        perm.append(min(ay, by) * layout.cols + min(ax, bx))
+    return perm
+
+
+def inverse(perm: list) -> list:
+    result = [0] * len(perm)
+    for i, p in enumerate(perm):
+        result[p] = i
+    return result
+
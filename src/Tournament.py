@@ -0,0 +1,286 @@
+"""
+Headless bot-vs-bot tournaments.
+
+Every pair of bots plays a number of seeded games on a process pool, with
+sides swapped between games. Example:
+
+    python Tournament.py MinimaxBot:time_limit=0.1 LocalSearchBot RandomBot --games 200 --workers 4
+
+--stats writes the per-move search statistics of every game as JSON lines
+(see SearchStats), --records the moves of every game (see GameRecord).
+"""
+
+from argparse import ArgumentParser
+from ast import literal_eval
+from multiprocessing import Pool
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from Bitboard import Bitboard
+from Bot import Bot
+from GameAction import GameAction
+from GameEngine import GameEngine
+from GameState import GameState
+from GameRecord import GameRecord, write_records
+from SearchStats import MoveStats, game_record
+import json
+import csv
+import itertools
+import random
+import time
+import numpy as np
+
+
+class GameResult(NamedTuple):
+    """
+    Outcome of one game. player1 always moves first.
+    """
+
+    seed: int
+    player1: str
+    player2: str
+    player1_score: int
+    player2_score: int
+    moves: int
+    player1_time: float
+    player2_time: float
+
+
+def load_bot_class(name: str):
+    module = __import__(name)
+    cls = getattr(module, name)
+    if not (isinstance(cls, type) and issubclass(cls, Bot)):
+        raise TypeError(name + " is not a Bot")
+    return cls
+
+
+def parse_spec(spec: str) -> Tuple[str, dict]:
+    """
+    The class name and keyword arguments of "ClassName" or
+    "ClassName:arg=value,arg=value", values being Python literals.
+    """
+    name, _, args = spec.partition(":")
+    kwargs = {}
+    if args:
+        for arg in args.split(","):
+            key, _, value = arg.partition("=")
+            kwargs[key.strip()] = literal_eval(value.strip())
+    return name.strip(), kwargs
+
+
+def make_bot(spec: str) -> Bot:
+    """
+    Builds a bot from a spec (see parse_spec). The class is imported from
+    the module of the same name, so only pass specs from trusted sources
+    such as the command line; BotServer checks specs of clients.
+    """
+    name, kwargs = parse_spec(spec)
+    return load_bot_class(name)(**kwargs)
+
+
+def play_game(player1: str, player2: str, number_of_dots: int = 4, seed: int = 0,
+              stats: Optional[List[MoveStats]] = None,
+              records: Optional[List[GameRecord]] = None, opening: int = 0) -> GameResult:
+    """
+    Plays one game, the first opening moves chosen at random among those
+    not giving a box away (see random_opening_action). When stats is a list, the MoveStats of every move are
+    appended to it, with bot set to the spec of the bot. When records is a
+    list, the GameRecord of the game with move times is appended to it.
+    """
+    random.seed(seed)
+    np.random.seed(seed % (1 << 32))
+    bots = {True: make_bot(player1), False: make_bot(player2)}
+    if stats is not None:
+        for player1_turn, spec in ((True, player1), (False, player2)):
+            bots[player1_turn].set_stats_hook(
+                lambda move, spec=spec: stats.append(move._replace(bot=spec)))
+    times = {True: 0.0, False: 0.0}
+
+    engine = GameEngine(number_of_dots)
+    actions = []
+    move_times = []
+    rng = random.Random(seed)
+    try:
+        while not engine.is_gameover():
+            player1_turn = engine.player1_turn
+            if len(actions) < opening:
+                action = random_opening_action(engine.get_state(), rng)
+                engine.play_action(action)
+                actions.append(action)
+                move_times.append(0.0)
+                continue
+            start = time.perf_counter()
+            action = bots[player1_turn].get_action(engine.get_state())
+            move_times.append(time.perf_counter() - start)
+            times[player1_turn] += move_times[-1]
+            engine.play_action(action)
+            actions.append(action)
+    finally:
+        # e.g. the worker processes of MinimaxBot
+        for bot in bots.values():
+            if hasattr(bot, "close"):
+                bot.close()
+    moves = len(actions)
+
+    if records is not None:
+        records.append(GameRecord.from_actions(number_of_dots, actions, True, move_times))
+    player1_score, player2_score = engine.scores()
+    return GameResult(seed, player1, player2, player1_score, player2_score,
+                      moves, times[True], times[False])
+
+
+def random_opening_action(state: GameState, rng: random.Random) -> GameAction:
+    board = Bitboard.from_state(state)
+    moves = board.free_edges()
+    safe = [edge for edge in moves if not board.creates_three_sided_box(edge)]
+    return board.action_of(rng.choice(safe or moves))
+
+
+# runs in the pool, returns the result with the stats and record when asked for
+def _play_game(args):
+    *game, with_stats, with_record = args
+    stats = [] if with_stats else None
+    records = [] if with_record else None
+    result = play_game(*game, stats=stats, records=records)
+    return result, stats, records[0] if records else None
+
+
+def schedule(bots: List[str], games: int, number_of_dots: int, seed: int) -> list:
+    """
+    Games for every pair of bots, each bot moving first in half of them.
+    """
+    jobs = []
+    for pair, (a, b) in enumerate(itertools.combinations(bots, 2)):
+        for game in range(games):
+            game_seed = seed + pair * games + game
+            if game % 2 == 0:
+                jobs.append((a, b, number_of_dots, game_seed))
+            else:
+                jobs.append((b, a, number_of_dots, game_seed))
+    return jobs
+
+
+def run_tournament(bots: List[str], games: int = 100, number_of_dots: int = 4,
+                   seed: int = 0, workers: Optional[int] = None,
+                   stats_path: Optional[str] = None,
+                   records_path: Optional[str] = None) -> List[GameResult]:
+    """
+    Plays every scheduled game. With stats_path, the search statistics of
+    each game are appended to that file as one JSON line, with
+    records_path the GameRecord of each game to that file.
+    """
+    jobs = [job + (stats_path is not None, records_path is not None)
+            for job in schedule(bots, games, number_of_dots, seed)]
+    if workers == 1:
+        outcomes = [_play_game(job) for job in jobs]
+    else:
+        with Pool(workers) as pool:
+            outcomes = pool.map(_play_game, jobs, chunksize=max(1, len(jobs) // 64))
+
+    if stats_path is not None:
+        with open(stats_path, "a") as f:
+            for result, stats, _ in outcomes:
+                f.write(json.dumps(game_record(stats, **result._asdict())) + "\n")
+    if records_path is not None:
+        write_records(records_path, [record for _, _, record in outcomes])
+    return [result for result, _, _ in outcomes]
+
+
+def summarize(results: List[GameResult]) -> Dict[str, dict]:
+    table = {}
+
+    def row(name):
+        return table.setdefault(name, {
+            "games": 0, "wins": 0, "losses": 0, "draws": 0,
+            "score": 0, "conceded": 0, "moves": 0, "time": 0.0})
+
+    for result in results:
+        sides = [
+            (result.player1, result.player1_score, result.player2_score, result.player1_time),
+            (result.player2, result.player2_score, result.player1_score, result.player2_time),
+        ]
+        for name, score, conceded, think_time in sides:
+            r = row(name)
+            r["games"] += 1
+            r["score"] += score
+            r["conceded"] += conceded
+            r["time"] += think_time
+            r["moves"] += result.moves
+            if score > conceded:
+                r["wins"] += 1
+            elif score < conceded:
+                r["losses"] += 1
+            else:
+                r["draws"] += 1
+    return table
+
+
+def head_to_head(results: List[GameResult]) -> Dict[str, Dict[str, float]]:
+    """
+    Win rate of the row bot against the column bot, draws counting half.
+    """
+    points = {}
+    games = {}
+    for result in results:
+        for me, other, mine, theirs in (
+                (result.player1, result.player2, result.player1_score, result.player2_score),
+                (result.player2, result.player1, result.player2_score, result.player1_score)):
+            key = (me, other)
+            games[key] = games.get(key, 0) + 1
+            points[key] = points.get(key, 0) + (1 if mine > theirs else 0.5 if mine == theirs else 0)
+    matrix = {}
+    for (me, other), n in games.items():
+        matrix.setdefault(me, {})[other] = points[me, other] / n
+    return matrix
+
+
+def format_table(results: List[GameResult]) -> str:
+    table = summarize(results)
+    width = max(len(name) for name in table) + 2
+    lines = ["{:<{w}}{:>7}{:>7}{:>7}{:>7}{:>10}{:>12}".format(
+        "bot", "games", "wins", "losses", "draws", "avg diff", "sec/game", w=width)]
+    for name, r in sorted(table.items(), key=lambda item: -item[1]["wins"]):
+        lines.append("{:<{w}}{:>7}{:>7}{:>7}{:>7}{:>10.2f}{:>12.3f}".format(
+            name, r["games"], r["wins"], r["losses"], r["draws"],
+            (r["score"] - r["conceded"]) / r["games"], r["time"] / r["games"], w=width))
+
+    matrix = head_to_head(results)
+    names = sorted(matrix)
+    lines.append("")
+    lines.append("win rate (row vs column)")
+    lines.append(" " * width + "".join("{:>{w}}".format(n[:width - 1], w=width) for n in names))
+    for me in names:
+        cells = ["{:>{w}}".format("-" if other == me else
+                                  "{:.3f}".format(matrix[me].get(other, float("nan"))), w=width)
+                 for other in names]
+        lines.append("{:<{w}}".format(me, w=width) + "".join(cells))
+    return "\n".join(lines)
+
+
+def write_csv(results: List[GameResult], path: str):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(GameResult._fields)
+        writer.writerows(results)
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Play bots against each other without the window.")
+    parser.add_argument("bots", nargs="+", help='bot specs, e.g. MinimaxBot:time_limit=0.1')
+    parser.add_argument("--games", type=int, default=100, help="games per pair of bots")
+    parser.add_argument("--dots", type=int, default=4, help="number of dots on each side")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None, help="processes, default one per CPU")
+    parser.add_argument("--csv", default=None, help="also write every game to this file")
+    parser.add_argument("--stats", default=None, help="append per-move search statistics to this JSON lines file")
+    parser.add_argument("--records", default=None, help="append the moves of every game to this GameRecord file")
+    args = parser.parse_args()
+
+    if len(args.bots) < 2:
+        parser.error("at least two bots are needed")
+
+    start = time.perf_counter()
+    results = run_tournament(args.bots, args.games, args.dots, args.seed, args.workers,
+                             args.stats, args.records)
+    print(format_table(results))
+    print("\n{} games in {:.1f} s".format(len(results), time.perf_counter() - start))
+    if args.csv:
+        write_csv(results, args.csv)
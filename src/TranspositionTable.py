@@ -0,0 +1,73 @@
+from typing import NamedTuple, Optional
+
+EXACT = 0
+LOWER_BOUND = 1
+UPPER_BOUND = 2
+
+
+class TTEntry(NamedTuple):
+    """
+    key: full Zobrist hash of the position
+    depth: remaining search depth the value was computed with
+    value: minimax value, or a bound on it (see flag)
+    flag: EXACT, LOWER_BOUND or UPPER_BOUND
+    best_move: edge which produced value, or -1
+    generation: search generation the entry was stored in
+    """
+
+    key: int
+    depth: int
+    value: int
+    flag: int
+    best_move: int
+    generation: int
+
+
+class TranspositionTable:
+    """
+    Fixed-size hash table of searched positions, indexed by the low bits of
+    the Zobrist hash.
+
+    A slot holding another position is only overwritten by an entry searched
+    at least as deep, unless the old entry comes from an earlier search
+    generation (call new_search once per get_action). This keeps the
+    expensive entries while letting stale ones age out.
+    """
+
+    def __init__(self, size: int = 1 << 16):
+        if size <= 0 or size & (size - 1):
+            raise ValueError("size must be a power of two")
+        self.size = size
+        self.mask = size - 1
+        self.generation = 0
+        self.slots = [None] * size
+
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    def clear(self):
+        self.slots = [None] * self.size
+        self.generation = 0
+
+    def new_search(self):
+        self.generation += 1
+
+    def probe(self, key: int) -> Optional[TTEntry]:
+        entry = self.slots[key & self.mask]
+        if entry is not None and entry.key == key:
+            self.hits += 1
+            return entry
+        self.misses += 1
+        return None
+
+    def store(self, key: int, depth: int, value: int, flag: int, best_move: int = -1):
+        index = key & self.mask
+        old = self.slots[index]
+        if old is not None and old.key != key:
+            if old.generation == self.generation and old.depth > depth:
+                return
+            self.evictions += 1
+        self.slots[index] = TTEntry(key, depth, value, flag, best_move, self.generation)
+        self.stores += 1
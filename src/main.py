@@ -7,7 +7,8 @@ from tkinter import *
 import numpy as np
 from typing import Optional
 from Bot import Bot
-from GameState import GameState
+from BotRunner import BotRunner
+from GameEngine import GameEngine
 from LocalSearchBot import LocalSearchBot
 from MinimaxBot import MinimaxBot
 
@@ -24,46 +25,58 @@ player1_color_light = '#67B0CF'
 player2_color = '#EE4035'
 player2_color_light = '#EE7E77'
 Green_color = '#7BC043'
-dot_width = 0.25*size_of_board/number_of_dots
-edge_width = 0.1*size_of_board/number_of_dots
-distance_between_dots = size_of_board / (number_of_dots)
 
 BOT_TURN_INTERVAL_MS = 100
+# how often a running bot move is checked for completion
+BOT_POLL_INTERVAL_MS = 20
 LEFT_CLICK = '<Button-1>'
+NEW_GAME_KEY = '<Key-n>'
 
 
 class Dots_and_Boxes():
     # ------------------------------------------------------------------
     # Initialization functions
     # ------------------------------------------------------------------
-    def __init__(self, bot1: Optional[Bot] = None, bot2: Optional[Bot] = None):
+    def __init__(self, bot1: Optional[Bot] = None, bot2: Optional[Bot] = None,
+                 number_of_dots: int = number_of_dots, ponder: bool = False):
+        self.number_of_dots = number_of_dots
+        self.dot_width = 0.25*size_of_board/number_of_dots
+        self.edge_width = 0.1*size_of_board/number_of_dots
+        self.distance_between_dots = size_of_board / (number_of_dots)
+
         self.window = Tk()
         self.window.title('Dots_and_Boxes')
         self.canvas = Canvas(
             self.window, width=size_of_board, height=size_of_board)
         self.canvas.pack()
         self.player1_starts = True
-        self.refresh_board()
+        # every item of the board is created once, moves only show and recolor them
+        self.edge_handles = {}
+        self.box_handles = {}
+        self.turntext_handle = None
+        self.draw_board()
 
         self.bot1 = bot1
         self.bot2 = bot2
+        # bots move on a worker thread, game_id tells stale moves apart
+        self.runner = BotRunner(ponder)
+        self.game_id = 0
+        self.window.bind(NEW_GAME_KEY, self.new_game)
+        self.window.protocol('WM_DELETE_WINDOW', self.close)
         self.play_again()
 
     def play_again(self):
-        self.refresh_board()
-        self.board_status = np.zeros(
-            shape=(number_of_dots - 1, number_of_dots - 1))
-        self.row_status = np.zeros(shape=(number_of_dots, number_of_dots - 1))
-        self.col_status = np.zeros(shape=(number_of_dots - 1, number_of_dots))
-        self.pointsScored = False
+        self.runner.cancel()
+        self.game_id += 1
+        self.window.unbind(LEFT_CLICK)
+        self.clear_board()
 
         # Input from user in form of clicks
         self.player1_starts = not self.player1_starts
-        self.player1_turn = not self.player1_starts
+        self.engine = GameEngine(self.number_of_dots, not self.player1_starts)
         self.reset_board = False
-        self.turntext_handle = []
 
-        self.already_marked_boxes = []
+        self.already_marked_boxes = set()
         self.display_turn_text()
 
         self.turn()
@@ -71,126 +84,115 @@ class Dots_and_Boxes():
     def mainloop(self):
         self.window.mainloop()
 
+    def new_game(self, event=None):
+        self.play_again()
+
+    def close(self):
+        self.runner.shutdown()
+        self.window.destroy()
+
     # ------------------------------------------------------------------
     # Logical Functions:
     # The modules required to carry out game logic
     # ------------------------------------------------------------------
 
-    def is_grid_occupied(self, logical_position, type):
-        x = logical_position[0]
-        y = logical_position[1]
-        occupied = True
+    # the game rules live in GameEngine, the window only reads its state
+    @property
+    def board_status(self):
+        return self.engine.board_status
 
-        if type == 'row' and self.row_status[y][x] == 0:
-            occupied = False
-        if type == 'col' and self.col_status[y][x] == 0:
-            occupied = False
+    @property
+    def row_status(self):
+        return self.engine.row_status
 
-        return occupied
+    @property
+    def col_status(self):
+        return self.engine.col_status
+
+    @property
+    def player1_turn(self):
+        return self.engine.player1_turn
+
+    def is_grid_occupied(self, logical_position, type):
+        return self.engine.is_grid_occupied(logical_position, type)
 
     def convert_grid_to_logical_position(self, grid_position):
         grid_position = np.array(grid_position)
-        position = (grid_position-distance_between_dots /
-                    4)//(distance_between_dots/2)
+        position = (grid_position-self.distance_between_dots /
+                    4)//(self.distance_between_dots/2)
 
         type = False
         logical_position = []
         if position[1] % 2 == 0 and (position[0] - 1) % 2 == 0:
             x = int((position[0]-1)//2)
             y = int(position[1]//2)
-            logical_position = [x, y]
-            type = 'row'
+            if 0 <= x < self.number_of_dots - 1 and 0 <= y < self.number_of_dots:
+                logical_position = [x, y]
+                type = 'row'
             # self.row_status[c][r]=1
         elif position[0] % 2 == 0 and (position[1] - 1) % 2 == 0:
             y = int((position[1] - 1) // 2)
             x = int(position[0] // 2)
-            logical_position = [x, y]
-            type = 'col'
+            if 0 <= x < self.number_of_dots and 0 <= y < self.number_of_dots - 1:
+                logical_position = [x, y]
+                type = 'col'
 
         return logical_position, type
 
-    def pointScored(self):
-        self.pointsScored = True
-
-    def mark_box(self):
-        boxes = np.argwhere(self.board_status == -4)
-        for box in boxes:
-            if list(box) not in self.already_marked_boxes and list(box) != []:
-                self.already_marked_boxes.append(list(box))
-                color = player1_color_light
-                self.shade_box(box, color)
-
-        boxes = np.argwhere(self.board_status == 4)
-        for box in boxes:
-            if list(box) not in self.already_marked_boxes and list(box) != []:
-                self.already_marked_boxes.append(list(box))
-                color = player2_color_light
-                self.shade_box(box, color)
-
-    def update_board(self, type, logical_position):
-        x = logical_position[0]
-        y = logical_position[1]
-        val = 1
-        playerModifier = 1
-        if self.player1_turn:
-            playerModifier = -1
-
-        if y < (number_of_dots-1) and x < (number_of_dots-1):
-            self.board_status[y][x] = (
-                abs(self.board_status[y][x]) + val) * playerModifier
-            if abs(self.board_status[y][x]) == 4:
-                self.pointScored()
-
+    # boxes (row, column) on either side of an edge
+    def edge_boxes(self, type, logical_position):
+        x, y = logical_position
         if type == 'row':
-            self.row_status[y][x] = 1
-            if y >= 1:
-                self.board_status[y-1][x] = (abs(self.board_status[y-1]
-                                             [x]) + val) * playerModifier
-                if abs(self.board_status[y-1][x]) == 4:
-                    self.pointScored()
-
-        elif type == 'col':
-            self.col_status[y][x] = 1
-            if x >= 1:
-                self.board_status[y][x -
-                                     1] = (abs(self.board_status[y][x-1]) + val) * playerModifier
-                if abs(self.board_status[y][x-1]) == 4:
-                    self.pointScored()
+            boxes = [(y - 1, x), (y, x)]
+        else:
+            boxes = [(y, x - 1), (y, x)]
+        size = self.number_of_dots - 1
+        return [(r, c) for r, c in boxes if 0 <= r < size and 0 <= c < size]
+
+    # only the boxes next to the edge just played can have been completed
+    def mark_box(self, type, logical_position):
+        for box in self.edge_boxes(type, logical_position):
+            status = self.board_status[box]
+            if abs(status) == 4 and box not in self.already_marked_boxes:
+                self.already_marked_boxes.add(box)
+                color = player1_color_light if status < 0 else player2_color_light
+                self.shade_box(box, color)
 
     def is_gameover(self):
-        return (self.row_status == 1).all() and (self.col_status == 1).all()
+        return self.engine.is_gameover()
 
     # ------------------------------------------------------------------
     # Drawing Functions:
     # The modules required to draw required game based object on canvas
     # ------------------------------------------------------------------
 
-    def make_edge(self, type, logical_position):
+    def edge_coordinates(self, type, logical_position):
         if type == 'row':
-            start_x = distance_between_dots/2 + \
-                logical_position[0]*distance_between_dots
-            end_x = start_x+distance_between_dots
-            start_y = distance_between_dots/2 + \
-                logical_position[1]*distance_between_dots
+            start_x = self.distance_between_dots/2 + \
+                logical_position[0]*self.distance_between_dots
+            end_x = start_x+self.distance_between_dots
+            start_y = self.distance_between_dots/2 + \
+                logical_position[1]*self.distance_between_dots
             end_y = start_y
         elif type == 'col':
-            start_y = distance_between_dots / 2 + \
-                logical_position[1] * distance_between_dots
-            end_y = start_y + distance_between_dots
-            start_x = distance_between_dots / 2 + \
-                logical_position[0] * distance_between_dots
+            start_y = self.distance_between_dots / 2 + \
+                logical_position[1] * self.distance_between_dots
+            end_y = start_y + self.distance_between_dots
+            start_x = self.distance_between_dots / 2 + \
+                logical_position[0] * self.distance_between_dots
             end_x = start_x
+        return start_x, start_y, end_x, end_y
 
+    def make_edge(self, type, logical_position):
         if self.player1_turn:
             color = player1_color
         else:
             color = player2_color
-        self.canvas.create_line(start_x, start_y, end_x,
-                                end_y, fill=color, width=edge_width)
+        handle = self.edge_handles[type, tuple(logical_position)]
+        self.canvas.itemconfigure(handle, fill=color, state='normal')
 
     def display_gameover(self):
-        player1_score = len(np.argwhere(self.board_status == -4))
-        player2_score = len(np.argwhere(self.board_status == 4))
+        player1_score, player2_score = self.engine.scores()
 
         if player1_score > player2_score:
             # Player 1 wins
@@ -203,66 +205,79 @@ class Dots_and_Boxes():
             text = 'Its a tie'
             color = 'gray'
 
-        self.canvas.delete("all")
+        self.canvas.itemconfigure('board', state='hidden')
         self.canvas.create_text(
-            size_of_board / 2, size_of_board / 3, font="cmr 60 bold", fill=color, text=text)
+            size_of_board / 2, size_of_board / 3, font="cmr 60 bold", fill=color, text=text,
+            tags='gameover')
 
         score_text = 'Scores \n'
         self.canvas.create_text(size_of_board / 2, 5 * size_of_board / 8, font="cmr 40 bold", fill=Green_color,
-                                text=score_text)
+                                text=score_text, tags='gameover')
 
         score_text = 'Player 1 : ' + str(player1_score) + '\n'
         score_text += 'Player 2 : ' + str(player2_score) + '\n'
         # score_text += 'Tie                    : ' + str(self.tie_score)
         self.canvas.create_text(size_of_board / 2, 3 * size_of_board / 4, font="cmr 30 bold", fill=Green_color,
-                                text=score_text)
+                                text=score_text, tags='gameover')
         self.reset_board = True
 
         score_text = 'Click to play again \n'
         self.canvas.create_text(size_of_board / 2, 15 * size_of_board / 16, font="cmr 20 bold", fill="gray",
-                                text=score_text)
-
-    def refresh_board(self):
-        for i in range(number_of_dots):
-            x = i*distance_between_dots+distance_between_dots/2
-            self.canvas.create_line(x, distance_between_dots/2, x,
-                                    size_of_board-distance_between_dots/2,
-                                    fill='gray', dash=(2, 2))
-            self.canvas.create_line(distance_between_dots/2, x,
-                                    size_of_board-distance_between_dots/2, x,
-                                    fill='gray', dash=(2, 2))
-
-        for i in range(number_of_dots):
-            for j in range(number_of_dots):
-                start_x = i*distance_between_dots+distance_between_dots/2
-                end_x = j*distance_between_dots+distance_between_dots/2
-                self.canvas.create_oval(start_x-dot_width/2, end_x-dot_width/2, start_x+dot_width/2,
-                                        end_x+dot_width/2, fill=dot_color,
-                                        outline=dot_color)
-
-    def display_turn_text(self):
-        text = 'Next turn: '
-        if self.player1_turn:
-            text += 'Player1'
-            color = player1_color
-        else:
-            text += 'Player2'
-            color = player2_color
-
-        self.canvas.delete(self.turntext_handle)
-        self.turntext_handle = self.canvas.create_text(size_of_board - 5*len(text),
-                                                       size_of_board-distance_between_dots/8,
-                                                       font="cmr 15 bold", text=text, fill=color)
+                                text=score_text, tags='gameover')
+
+    # creates every item of the board, edges and boxes hidden until played;
+    # boxes go below edges and dots above them
+    def draw_board(self):
+        size = self.number_of_dots - 1
+        for r in range(size):
+            for c in range(size):
+                self.box_handles[r, c] = self.canvas.create_rectangle(
+                    *self.box_coordinates((r, c)), outline='', state='hidden', tags=('board', 'box'))
+
+        for i in range(self.number_of_dots):
+            x = i*self.distance_between_dots+self.distance_between_dots/2
+            self.canvas.create_line(x, self.distance_between_dots/2, x,
+                                    size_of_board-self.distance_between_dots/2,
+                                    fill='gray', dash=(2, 2), tags='board')
+            self.canvas.create_line(self.distance_between_dots/2, x,
+                                    size_of_board-self.distance_between_dots/2, x,
+                                    fill='gray', dash=(2, 2), tags='board')
+
+        for y in range(self.number_of_dots):
+            for x in range(size):
+                for type, position in (('row', (x, y)), ('col', (y, x))):
+                    self.edge_handles[type, position] = self.canvas.create_line(
+                        *self.edge_coordinates(type, position), width=self.edge_width,
+                        state='hidden', tags=('board', 'edge'))
+
+        for i in range(self.number_of_dots):
+            for j in range(self.number_of_dots):
+                start_x = i*self.distance_between_dots+self.distance_between_dots/2
+                end_x = j*self.distance_between_dots+self.distance_between_dots/2
+                self.canvas.create_oval(start_x-self.dot_width/2, end_x-self.dot_width/2, start_x+self.dot_width/2,
+                                        end_x+self.dot_width/2, fill=dot_color,
+                                        outline=dot_color, tags='board')
+
+        self.turntext_handle = self.canvas.create_text(0, 0, font="cmr 15 bold", tags='board')
+
+    # back to an empty board after a game
+    def clear_board(self):
+        self.canvas.delete('gameover')
+        self.canvas.itemconfigure('board', state='normal')
+        self.canvas.itemconfigure('edge', state='hidden')
+        self.canvas.itemconfigure('box', state='hidden')
+
+    def box_coordinates(self, box):
+        start_x = self.distance_between_dots / 2 + \
+            box[1] * self.distance_between_dots + self.edge_width/2
+        start_y = self.distance_between_dots / 2 + \
+            box[0] * self.distance_between_dots + self.edge_width/2
+        end_x = start_x + self.distance_between_dots - self.edge_width
+        end_y = start_y + self.distance_between_dots - self.edge_width
+        return start_x, start_y, end_x, end_y
 
     def shade_box(self, box, color):
-        start_x = distance_between_dots / 2 + \
-            box[1] * distance_between_dots + edge_width/2
-        start_y = distance_between_dots / 2 + \
-            box[0] * distance_between_dots + edge_width/2
-        end_x = start_x + distance_between_dots - edge_width
-        end_y = start_y + distance_between_dots - edge_width
-        self.canvas.create_rectangle(
-            start_x, start_y, end_x, end_y, fill=color, outline='')
+        self.canvas.itemconfigure(self.box_handles[tuple(box)], fill=color, state='normal')
 
     def display_turn_text(self):
         text = 'Next turn: '
@@ -273,10 +288,9 @@ class Dots_and_Boxes():
             text += 'Player2'
             color = player2_color
 
-        self.canvas.delete(self.turntext_handle)
-        self.turntext_handle = self.canvas.create_text(size_of_board - 5*len(text),
-                                                       size_of_board-distance_between_dots/8,
-                                                       font="cmr 15 bold", text=text, fill=color)
+        self.canvas.itemconfigure(self.turntext_handle, text=text, fill=color)
+        self.canvas.coords(self.turntext_handle, size_of_board - 5*len(text),
+                           size_of_board-self.distance_between_dots/8)
 
     def click(self, event):
         if not self.reset_board:
@@ -285,20 +299,15 @@ class Dots_and_Boxes():
                 grid_position)
             self.update(valid_input, logical_position)
         else:
-            self.canvas.delete("all")
             self.play_again()
             self.reset_board = False
 
     def update(self, valid_input, logical_position):
         if valid_input and not self.is_grid_occupied(logical_position, valid_input):
             self.window.unbind(LEFT_CLICK)
-            self.update_board(valid_input, logical_position)
             self.make_edge(valid_input, logical_position)
-            self.mark_box()
-            self.refresh_board()
-            self.player1_turn = (
-                not self.player1_turn) if not self.pointsScored else self.player1_turn
-            self.pointsScored = False
+            self.engine.play(valid_input, logical_position)
+            self.mark_box(valid_input, logical_position)
 
             if self.is_gameover():
                 # self.canvas.delete("all")
@@ -312,17 +321,27 @@ class Dots_and_Boxes():
         current_bot = self.bot1 if self.player1_turn else self.bot2
         if current_bot is None:
             self.window.bind(LEFT_CLICK, self.click)
+            # think about the replies while the human decides
+            other_bot = self.bot2 if self.player1_turn else self.bot1
+            if other_bot is not None:
+                self.runner.ponder(other_bot, self.engine.get_state())
         else:
-            self.window.after(BOT_TURN_INTERVAL_MS, self.bot_turn, current_bot)
-
-    def bot_turn(self, bot: Bot):
-        action = bot.get_action(GameState(
-            self.board_status.copy(),
-            self.row_status.copy(),
-            self.col_status.copy(),
-            self.player1_turn
-        ))
-
+            self.window.after(BOT_TURN_INTERVAL_MS, self.bot_turn, current_bot, self.game_id)
+
+    def bot_turn(self, bot: Bot, game_id: int):
+        if game_id != self.game_id:
+            return
+        future = self.runner.request(bot, self.engine.get_state())
+        self.poll_bot(future, game_id)
+
+    # the move is searched on the worker thread, check back until it is done
+    def poll_bot(self, future, game_id: int):
+        if game_id != self.game_id:
+            return
+        if not future.done():
+            self.window.after(BOT_POLL_INTERVAL_MS, self.poll_bot, future, game_id)
+            return
+        action = future.result()
         self.update(action.action_type, action.position)
 
 
@@ -332,6 +351,9 @@ if __name__ == "__main__":
     PvP mode: game_instance = Dots_and_Boxes(None, None)
     PvB mode: game_instance = Dots_and_Boxes(None, BotName()) or game_instance = Dots_and_Boxes(BotName(), None)
     BvB mode: game_instance = Dots_and_Boxes(BotName(), BotName())
+    Board size: game_instance = Dots_and_Boxes(BotName(), None, number_of_dots=6) for a 5x5 board
+    Bot thinking on your time: game_instance = Dots_and_Boxes(MinimaxBot(), None, ponder=True)
+    Press n for a new game at any time.
     """
     game_instance = Dots_and_Boxes(MinimaxBot(), None)
     #game_instance = Dots_and_Boxes(MinimaxBot(), LocalSearchBot())
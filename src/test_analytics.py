@@ -0,0 +1,42 @@
+"""
+GameAnalytics run serially and on a process pool over the same shards.
+"""
+
+from BatchSimulator import BatchSimulator
+from BoardLayout import BoardLayout
+from GameAnalytics import analyze
+from GameRecord import write_records
+from Tournament import play_game
+import pytest
+
+
+@pytest.fixture(scope="module")
+def shards(tmp_path_factory):
+    directory = tmp_path_factory.mktemp("shards")
+    paths = []
+    # shards of different sizes finish out of order on the pool
+    for i in range(5):
+        simulator = BatchSimulator(BoardLayout.get(3, 3), 200 * (5 - i), seed=i)
+        simulator.run("random" if i % 2 else "greedy")
+        paths.append(str(directory / "batch-{}.bin".format(i)))
+        write_records(paths[-1], simulator.records())
+    # and one with move times
+    records = []
+    for seed in range(6):
+        play_game("RandomBot", "LocalSearchBot", 4, seed, records=records)
+    paths.append(str(directory / "timed.bin"))
+    write_records(paths[-1], records)
+    return paths
+
+
+# max_positions 50 prunes the position table, which depends on merge order
+@pytest.mark.parametrize("max_positions", [50, 100000])
+def test_pool_matches_serial(shards, max_positions):
+    serial = analyze(shards, 1, 150, 12, max_positions)
+    assert serial.games == 200 * (5 + 4 + 3 + 2 + 1) + 6
+    assert serial.timed_moves > 0
+    for workers in (2, 3):
+        pooled = analyze(shards, workers, 150, 12, max_positions)
+        assert pooled.summary(1000) == serial.summary(1000)
+        assert pooled.positions == serial.positions
+        assert (pooled.time_counts == serial.time_counts).all()
@@ -0,0 +1,63 @@
+"""
+Bitboard's incrementally kept values against a recount from scratch.
+"""
+
+from Bitboard import Bitboard
+from BoardLayout import BoardLayout
+from GameEngine import GameEngine
+import random
+import pytest
+
+
+def snapshot(board: Bitboard) -> tuple:
+    return (board.edges, board.p1_boxes, board.p2_boxes, board.player1_turn, board.hash,
+            board.edge_hash, board.sym_edge_hashes, board.sym_hashes, board.score,
+            board.filled, board.three_sided, sorted(board.moves), board.moves.sides)
+
+
+def positions_consistent(board: Bitboard) -> bool:
+    moves = board.moves
+    return (all(moves.position[e] == i for i, e in enumerate(moves.moves))
+            and sum(p >= 0 for p in moves.position) == len(moves))
+
+
+def recount(board: Bitboard) -> tuple:
+    return snapshot(Bitboard(board.layout, board.edges, board.p1_boxes, board.p2_boxes,
+                             board.player1_turn))
+
+
+@pytest.mark.parametrize("rows, cols", [(1, 1), (2, 3), (3, 3), (4, 5)])
+def test_make_unmake_match_recount(rows, cols):
+    layout = BoardLayout.get(rows, cols)
+    rng = random.Random(rows * 10 + cols)
+    for _ in range(50):
+        board = Bitboard(layout)
+        snapshots = [snapshot(board)]
+        while not board.is_final():
+            board.make_move(rng.choice(board.free_edges()))
+            assert snapshot(board) == recount(board)
+            assert positions_consistent(board)
+            snapshots.append(snapshot(board))
+        # taking every move back passes through the same positions
+        while snapshots:
+            assert snapshot(board) == snapshots.pop()
+            assert positions_consistent(board)
+            if snapshots:
+                board.unmake_move()
+
+
+def test_make_move_follows_game_engine():
+    rng = random.Random(0)
+    for _ in range(20):
+        engine = GameEngine(4)
+        board = Bitboard.from_state(engine.get_state())
+        boxes = 0
+        while not engine.is_gameover():
+            edge = rng.choice(board.free_edges())
+            taken = board.make_move(edge)
+            engine.play_action(board.action_of(edge))
+            assert snapshot(board) == snapshot(Bitboard.from_state(engine.get_state()))
+            p1, p2 = engine.scores()
+            assert board.score == p2 - p1
+            assert taken == p1 + p2 - boxes
+            boxes = p1 + p2
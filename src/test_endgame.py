@@ -0,0 +1,53 @@
+"""
+EndgameSolver against brute force search to the end of the game. Run
+with python -m pytest from the repository root.
+"""
+
+from Bitboard import Bitboard
+from BoardLayout import BoardLayout
+from EndgameSolver import EndgameSolver
+from OpeningBook import exact_value
+import random
+import pytest
+
+
+def loony_positions(layout: BoardLayout, count: int, seed: int) -> list:
+    """
+    Positions EndgameSolver accepts, met while playing random games which
+    avoid giving boxes away for as long as they can.
+    """
+    rng = random.Random(seed)
+    solver = EndgameSolver()
+    positions = []
+    while len(positions) < count:
+        board = Bitboard(layout)
+        while not board.is_final():
+            if solver.solve(board) is not None:
+                positions.append(board.copy())
+            safe = board.moves.safe_moves()
+            board.make_move(rng.choice(safe or board.free_edges()))
+    return positions
+
+
+@pytest.mark.parametrize("rows, cols", [(2, 3), (3, 2), (3, 3), (2, 4)])
+def test_solve_matches_exact_value(rows, cols):
+    layout = BoardLayout.get(rows, cols)
+    solver = EndgameSolver()
+    memo = {}
+    for board in loony_positions(layout, 300, seed=rows * 10 + cols):
+        solution = solver.solve(board)
+        value, _ = exact_value(board, memo)
+        assert solution.value == value
+
+        # the solver's move keeps that value
+        taken = board.make_move(solution.edge)
+        rest, _ = exact_value(board, memo)
+        board.unmake_move()
+        assert (taken + rest if taken else -rest) == value
+
+
+def test_solve_rejects_positions_with_safe_moves():
+    board = Bitboard(BoardLayout.get(3, 3))
+    assert EndgameSolver().solve(board) is None
+    board.make_move(0)
+    assert EndgameSolver().solve(board) is None
@@ -0,0 +1,73 @@
+"""
+GameRecord files written with write_records and streamed back with
+read_records.
+"""
+
+from Bitboard import Bitboard
+from BoardLayout import BoardLayout
+from GameRecord import GameRecord, write_records, read_records
+from Tournament import play_game
+import random
+import pytest
+
+
+def random_record(rows: int, cols: int, rng: random.Random, with_times: bool) -> GameRecord:
+    board = Bitboard(BoardLayout.get(rows, cols), player1_turn=rng.random() < 0.5)
+    player1_starts = board.player1_turn
+    moves = []
+    while not board.is_final():
+        moves.append(rng.choice(board.free_edges()))
+        board.make_move(moves[-1])
+    # quarters are exact in the float32 the times are stored as
+    times = tuple(rng.randrange(40) / 4 for _ in moves) if with_times else None
+    return GameRecord(rows, cols, player1_starts, tuple(moves), times)
+
+
+def test_records_round_trip(tmp_path):
+    rng = random.Random(0)
+    records = []
+    played = []
+    for seed in range(3):
+        play_game("RandomBot", "LocalSearchBot", 4, seed, records=played)
+    # more than 256 edges on 12 x 12 boxes, stored as two bytes a move
+    for rows, cols, with_times in [(3, 3, False), (2, 5, True), (1, 1, True), (12, 12, True)]:
+        records.append(random_record(rows, cols, rng, with_times))
+    records.append(GameRecord(3, 3, True, ()))
+    records += [record._replace(times=None) for record in played]
+
+    path = str(tmp_path / "games.bin")
+    write_records(path, records[:4])
+    write_records(path, records[4:])
+    # small buffers split records between reads
+    for buffer_size in (7, 64, 1 << 20):
+        assert list(read_records(path, buffer_size)) == records
+
+    for record in records:
+        board = record.final_board()
+        assert record.scores() == (board.p1_boxes.bit_count(), board.p2_boxes.bit_count())
+    for record in played:
+        assert sum(record.scores()) == 9
+
+
+def test_played_games_keep_their_times(tmp_path):
+    records = []
+    play_game("RandomBot", "RandomBot", 3, 0, records=records)
+    path = str(tmp_path / "games.bin")
+    write_records(path, records, append=False)
+    [record] = read_records(path)
+    assert record.moves == records[0].moves
+    assert record.times == pytest.approx(records[0].times, abs=1e-6)
+
+
+def test_bad_magic_and_truncated_files(tmp_path):
+    data = b"".join(random_record(3, 3, random.Random(seed), True).to_bytes() for seed in range(3))
+    path = tmp_path / "games.bin"
+
+    path.write_bytes(b"XXXX" + data[4:])
+    with pytest.raises(ValueError):
+        list(read_records(str(path)))
+
+    for end in (len(data) - 1, len(data) - 30, 3):
+        path.write_bytes(data[:end])
+        with pytest.raises(ValueError):
+            list(read_records(str(path), 16))
@@ -0,0 +1,45 @@
+"""
+MCTSBot plays sensibly on small boards.
+"""
+
+from Bitboard import Bitboard
+from BoardLayout import BoardLayout
+from MCTSBot import MCTSBot
+from Tournament import play_game
+
+
+def test_beats_random_and_local_search():
+    for opponent in ("RandomBot", "LocalSearchBot"):
+        wins = 0
+        for seed in range(6):
+            bot = "MCTSBot:iterations=300,seed={}".format(seed)
+            if seed % 2 == 0:
+                result = play_game(bot, opponent, 4, seed)
+                wins += result.player1_score > result.player2_score
+            else:
+                result = play_game(opponent, bot, 4, seed)
+                wins += result.player2_score > result.player1_score
+        assert wins >= 5, opponent
+
+
+def test_takes_offered_box():
+    layout = BoardLayout.get(3, 3)
+    board = Bitboard(layout)
+    # three sides of the middle box, the fourth is the only capture
+    for edge in (layout.edge_of("row", (1, 1)), layout.edge_of("row", (1, 2)),
+                 layout.edge_of("col", (1, 1))):
+        board.make_move(edge)
+    capture = layout.edge_of("col", (2, 1))
+    assert board.completes_box(capture)
+    for seed in range(5):
+        action = MCTSBot(iterations=200, seed=seed).get_action(board.to_state())
+        assert board.edge_of(action) == capture
+
+
+def test_keeps_boxes_while_safe_moves_remain():
+    board = Bitboard(BoardLayout.get(3, 3))
+    board.make_move(0)
+    board.make_move(3)
+    for seed in range(5):
+        edge = board.edge_of(MCTSBot(iterations=200, seed=seed).get_action(board.to_state()))
+        assert not board.creates_three_sided_box(edge)
@@ -0,0 +1,86 @@
+"""
+MoveIndex built from game states against a recount from the marked edges.
+"""
+
+from BoardLayout import BoardLayout
+from GameAction import GameAction
+from GameEngine import GameEngine
+from MoveIndex import MoveIndex
+import random
+import pytest
+
+
+def marked_edges(state, layout: BoardLayout) -> int:
+    edges = 0
+    for action_type, status in (("row", state.row_status), ("col", state.col_status)):
+        for y, x in zip(*status.nonzero()):
+            edges |= 1 << layout.edge_of(action_type, (int(x), int(y)))
+    return edges
+
+
+def random_states(number_of_dots: int, seed: int):
+    """
+    The states of random games, with the edges marked in each.
+    """
+    layout = BoardLayout.get(number_of_dots - 1, number_of_dots - 1)
+    rng = random.Random(seed)
+    for _ in range(10):
+        engine = GameEngine(number_of_dots)
+        while not engine.is_gameover():
+            state = engine.get_state()
+            edges = marked_edges(state, layout)
+            yield state, edges
+            free = [e for e in range(layout.num_edges) if not edges >> e & 1]
+            action_type, position = layout.action_of(rng.choice(free))
+            engine.play_action(GameAction(action_type, position))
+
+
+def sides_of(edges: int, layout: BoardLayout) -> list:
+    return [(edges & mask).bit_count() for mask in layout.box_masks]
+
+
+@pytest.mark.parametrize("number_of_dots", [2, 3, 4, 6])
+def test_from_state_matches_recount(number_of_dots):
+    for state, edges in random_states(number_of_dots, number_of_dots):
+        index = MoveIndex.from_state(state)
+        layout = index.layout
+        assert sorted(index.moves) == [e for e in range(layout.num_edges) if not edges >> e & 1]
+        assert all(index.position[e] == i for i, e in enumerate(index.moves))
+        assert sum(p >= 0 for p in index.position) == len(index)
+        assert index.sides == sides_of(edges, layout)
+
+        built = MoveIndex(layout, edges)
+        assert sorted(built.moves) == sorted(index.moves)
+        assert built.sides == index.sides
+
+
+@pytest.mark.parametrize("number_of_dots", [2, 3, 4, 6])
+def test_edge_effects_match_recount(number_of_dots):
+    for state, edges in random_states(number_of_dots, number_of_dots + 100):
+        index = MoveIndex.from_state(state)
+        layout = index.layout
+        sides = sides_of(edges, layout)
+        completed, gives_away = index.edge_effects()
+        assert len(completed) == len(gives_away) == len(index)
+        for i, e in enumerate(index.moves):
+            around = [sides[b] for b in layout.edge_boxes[e]]
+            assert completed[i] == around.count(3) == index.boxes_completed(e)
+            assert gives_away[i] == (2 in around) == index.creates_three_sided_box(e)
+
+
+def test_sample_draws_every_free_edge():
+    rng = random.Random(0)
+    for state, edges in random_states(3, 7):
+        index = MoveIndex.from_state(state)
+        draws = [index.sample(rng) for _ in range(40 * len(index))]
+        assert set(draws) == set(index.moves)
+
+        # and still after edges are marked and unmarked again
+        removed = [index.moves[0], index.moves[-1]] if len(index) > 2 else []
+        for e in removed:
+            index.remove(e)
+        assert set(index.sample(rng) for _ in range(40 * len(index) + 1)) \
+            == set(index.moves) == set(draws) - set(removed)
+        for e in reversed(removed):
+            index.add(e)
+        assert set(index.moves) == set(draws)
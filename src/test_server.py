@@ -0,0 +1,112 @@
+"""
+BotServer and BotClient over a local socket.
+"""
+
+from BotClient import BotClient
+from BotServer import BotServer, MAX_TIME_LIMIT, parse_time_limit
+from GameEngine import GameEngine
+import asyncio
+import pytest
+
+
+async def served(test, **server_args):
+    server = BotServer("RandomBot", workers=2, **server_args)
+    await server.start(port=0)
+    client = BotClient()
+    await client.connect(port=server.port)
+    try:
+        return await test(server, client)
+    finally:
+        await client.close()
+        await server.close()
+
+
+def test_move_and_close():
+    async def test(server, client):
+        engine = GameEngine(3)
+        action = await client.get_action(engine.get_state(), "game", "MCTSBot:iterations=50,seed=0")
+        engine.play_action(action)
+        assert server.sessions["game"].moves == 1
+        action = await client.get_action(engine.get_state(), "game")
+        engine.play_action(action)
+        assert server.sessions["game"].moves == 2
+        assert await client.close_session("game")
+        assert "game" not in server.sessions
+        assert not await client.close_session("game")
+
+    asyncio.run(served(test))
+
+
+def test_throwaway_sessions_close_their_bot():
+    closed = []
+
+    async def test(server, client):
+        new_session = server.new_session
+
+        def tracked(spec):
+            session = new_session(spec)
+            session.bot.close = lambda: closed.append(session)
+            return session
+
+        server.new_session = tracked
+        await client.get_action(GameEngine(3).get_state())
+        assert not server.sessions
+        assert len(closed) == 1
+
+    asyncio.run(served(test))
+
+
+@pytest.mark.parametrize("spec", [
+    "os", "Tournament", "MinimaxBot:workers=4", "MinimaxBot:time_limit=1e9",
+    "MCTSBot:iterations=-1", "MCTSBot:exploration='1'"])
+def test_rejects_bots_and_arguments_not_served(spec):
+    async def test(server, client):
+        with pytest.raises(RuntimeError, match="ValueError"):
+            await client.get_action(GameEngine(3).get_state(), "game", spec)
+        assert not server.sessions
+
+    asyncio.run(served(test))
+
+
+def test_time_limit_checked():
+    assert parse_time_limit(None, 1.0) == 1.0
+    assert parse_time_limit(0.5, 1.0) == 0.5
+    assert parse_time_limit(1e9, 1.0) == MAX_TIME_LIMIT
+    for value in (0, -1, float("nan"), float("inf"), "1", True):
+        with pytest.raises(ValueError):
+            parse_time_limit(value, 1.0)
+
+    async def test(server, client):
+        with pytest.raises(RuntimeError, match="ValueError"):
+            await client.get_action(GameEngine(3).get_state(), time_limit=0)
+
+    asyncio.run(served(test))
+
+
+def test_timeout_answers_with_error():
+    async def test(server, client):
+        # without a time_limit of its own the bot runs until stopped
+        with pytest.raises(RuntimeError, match="TimeoutError"):
+            await client.get_action(GameEngine(5).get_state(), "slow",
+                                    "MCTSBot:iterations=1000000", time_limit=0.05)
+        # the stopped bot still plays the next move
+        await client.get_action(GameEngine(5).get_state(), "fast", "RandomBot")
+
+    asyncio.run(served(test))
+
+
+def test_eviction_keeps_sessions_with_a_pending_move():
+    async def test(server, client):
+        slow = asyncio.ensure_future(client.get_action(
+            GameEngine(5).get_state(), "slow", "MCTSBot:time_limit=0.3", time_limit=1.0))
+        while "slow" not in server.sessions:
+            await asyncio.sleep(0.01)
+        for i in range(3):
+            await client.get_action(GameEngine(3).get_state(), str(i), "RandomBot")
+        assert list(server.sessions) == ["slow", "2"]
+        assert not server.sessions["slow"].closed
+        await slow
+        await client.get_action(GameEngine(3).get_state(), "3", "RandomBot")
+        assert list(server.sessions) == ["2", "3"]
+
+    asyncio.run(served(test, max_sessions=2))
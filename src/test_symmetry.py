@@ -0,0 +1,38 @@
+"""
+The edge and box permutations of Symmetry against games played on the
+transformed board.
+"""
+
+from Bitboard import Bitboard, permute_bits
+from BoardLayout import BoardLayout
+import random
+import pytest
+
+
+def transformed(board: Bitboard, t: int) -> Bitboard:
+    layout = board.layout
+    return Bitboard(layout, permute_bits(board.edges, layout.edge_perms[t]),
+                    permute_bits(board.p1_boxes, layout.box_perms[t]),
+                    permute_bits(board.p2_boxes, layout.box_perms[t]), board.player1_turn)
+
+
+@pytest.mark.parametrize("rows, cols, count", [(3, 3, 8), (2, 3, 4), (4, 4, 8)])
+def test_transforms_keep_the_game(rows, cols, count):
+    layout = BoardLayout.get(rows, cols)
+    assert len(layout.transforms) == count
+    rng = random.Random(rows * 10 + cols)
+    for t in range(count):
+        perm, inverse = layout.edge_perms[t], layout.inverse_edge_perms[t]
+        assert sorted(perm) == list(range(layout.num_edges))
+        assert all(inverse[perm[e]] == e for e in range(layout.num_edges))
+        for _ in range(10):
+            board = Bitboard(layout)
+            image = transformed(board, t)
+            while not board.is_final():
+                assert image.score == board.score
+                assert sorted(image.free_edges()) == sorted(perm[e] for e in board.free_edges())
+                assert image.sym_hashes[0] == board.sym_hashes[t]
+                assert image.canonical()[0] == board.canonical()[0]
+                edge = rng.choice(board.free_edges())
+                assert image.make_move(perm[edge]) == board.make_move(edge)
+            assert image.is_final() and image.score == board.score
@@ -0,0 +1,91 @@
+"""
+TranspositionTable entries and replacement, and MinimaxBot's use of the
+table against brute force search to the end of the game.
+"""
+
+from Bitboard import Bitboard
+from BoardLayout import BoardLayout
+from MinimaxBot import MinimaxBot
+from OpeningBook import exact_value
+from TranspositionTable import EXACT, LOWER_BOUND, UPPER_BOUND, TranspositionTable
+import random
+import pytest
+
+
+def test_store_and_probe_bounds():
+    tt = TranspositionTable(16)
+    for key, flag in ((3, EXACT), (4, LOWER_BOUND), (5, UPPER_BOUND)):
+        tt.store(key, 2, key * 10, flag, key + 1)
+    for key, flag in ((3, EXACT), (4, LOWER_BOUND), (5, UPPER_BOUND)):
+        entry = tt.probe(key)
+        assert (entry.key, entry.depth, entry.value, entry.flag, entry.best_move) \
+            == (key, 2, key * 10, flag, key + 1)
+    # same slot, other position
+    assert tt.probe(3 + 16) is None
+    assert tt.probe(6) is None
+    assert (tt.hits, tt.misses, tt.stores) == (3, 2, 3)
+
+    tt.clear()
+    assert tt.probe(3) is None
+    with pytest.raises(ValueError):
+        TranspositionTable(12)
+
+
+def test_replacement_by_depth_and_generation():
+    tt = TranspositionTable(4)
+    tt.store(1, 5, 0, EXACT)
+    # a shallower entry of another position does not replace a deeper one
+    tt.store(1 + 4, 4, 0, EXACT)
+    assert tt.probe(1).depth == 5 and tt.probe(1 + 4) is None
+    # one at least as deep does
+    tt.store(1 + 4, 5, 7, LOWER_BOUND)
+    assert tt.probe(1) is None and tt.probe(1 + 4).value == 7
+    assert tt.evictions == 1
+    # the same position is always replaced
+    tt.store(1 + 4, 1, 8, UPPER_BOUND)
+    assert tt.probe(1 + 4).flag == UPPER_BOUND
+
+    tt.store(2, 9, 0, EXACT)
+    tt.new_search()
+    # entries of earlier searches give way to any depth, and keep their generation
+    assert tt.probe(2).generation == 0
+    tt.store(2 + 4, 1, 3, EXACT)
+    entry = tt.probe(2 + 4)
+    assert entry.generation == 1 and entry.value == 3
+    # and the new entry is kept from shallower ones of this search
+    tt.store(2, 0, 0, EXACT)
+    assert tt.probe(2) is None and tt.probe(2 + 4).value == 3
+
+
+def game_positions(layout: BoardLayout, free: int, count: int, seed: int) -> list:
+    """
+    Positions with free edges left, reached by random moves which avoid
+    giving boxes away while they can.
+    """
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        board = Bitboard(layout)
+        while board.num_free_edges() > free:
+            safe = board.moves.safe_moves()
+            board.make_move(rng.choice(safe or board.free_edges()))
+        positions.append(board)
+    return positions
+
+
+@pytest.mark.parametrize("tt_size", [1, 8, 1 << 16])
+@pytest.mark.parametrize("search_mode, symmetry", [("alphabeta", True), ("pvs", False)])
+def test_small_tables_keep_values_exact(tt_size, search_mode, symmetry):
+    layout = BoardLayout.get(3, 3)
+    memo = {}
+    bot = MinimaxBot(time_limit=None, tt_size=tt_size, endgame=False, seed=0,
+                     symmetry=symmetry, search_mode=search_mode)
+    for board in game_positions(layout, 11, 8, seed=tt_size):
+        # the table carries over from the previous position, a generation older
+        bot.prepare_table(board)
+        while not board.is_final():
+            value, edge = exact_value(board, memo)
+            sign = bot.getPlayerValue(board.player1_turn)
+            free = board.num_free_edges()
+            assert bot.minimax(board, free, -100, 100) == board.score + sign * value
+            board.make_move(edge)